@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from django.template.response import SimpleTemplateResponse
+
+from .cache import get_recipes_response_key, response_cache_stats
+from .mixins import cached_response
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def is_anonymous_json(request):
+    """Запрос без токена, на который DRF ответит в JSON."""
+    return (
+        'HTTP_AUTHORIZATION' not in request.META
+        and request.GET.get('format', 'json') == 'json'
+        and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+@sync_to_async(thread_sensitive=False)
+def get_shared_response(path, query):
+    """Ответ из общего кэша; обращение к кэшу блокирующее."""
+    return cache.get(get_recipes_response_key(path, query))
+
+
+def async_read_view(viewset, actions, shared_cache=False):
+    """
+    Асинхронное представление только для чтения.
+    ORM в Django 3.2 синхронный, поэтому вьюсет вместе с рендерингом
+    выполняется в пуле потоков со своим соединением с БД, и запросы
+    обрабатываются параллельно. С shared_cache ответы анонимным
+    пользователям берутся из общего кэша без обращения к вьюсету.
+    """
+    view = viewset.as_view(actions)
+
+    def render_view(request, *args, **kwargs):
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            if isinstance(response, SimpleTemplateResponse):
+                response.render()
+        finally:
+            # request_finished закрывает соединения только в потоке
+            # синхронного кода, соединения потока пула проверяются здесь.
+            close_old_connections()
+        return response
+
+    render_view = sync_to_async(render_view, thread_sensitive=False)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(('GET', 'HEAD'))
+        if shared_cache and is_anonymous_json(request):
+            cached = await get_shared_response(request.path, request.GET)
+            if cached is not None:
+                response_cache_stats['hit'] += 1
+                response = cached_response(request, *cached)
+                response['X-Cache'] = 'HIT'
+                return response
+        return await render_view(request, *args, **kwargs)
+
+    return async_view
+
+
+tag_list = async_read_view(TagViewSet, {'get': 'list'})
+tag_detail = async_read_view(TagViewSet, {'get': 'retrieve'})
+ingredient_list = async_read_view(IngredientViewSet, {'get': 'list'})
+ingredient_detail = async_read_view(IngredientViewSet, {'get': 'retrieve'})
+recipe_list = async_read_view(
+    RecipeViewSet, {'get': 'list'}, shared_cache=True
+)
+recipe_detail = async_read_view(
+    RecipeViewSet, {'get': 'retrieve'}, shared_cache=True
+)
@@ -0,0 +1,55 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import CustomUser
+
+TOKEN_USER_KEY = 'auth_token_user:{digest}'
+
+
+def get_token_user_key(key):
+    return TOKEN_USER_KEY.format(digest=sha256(key.encode()).hexdigest())
+
+
+def reset_token_users(*keys):
+    """Удаление снимков пользователей по ключам токенов."""
+    cache.delete_many([get_token_user_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пользователя.
+    Снимок пользователя хранится в кэше Django по хэшу токена
+    и сбрасывается при удалении токена и изменении пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_user_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, user, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
+
+
+@receiver(post_delete, sender=Token)
+def reset_deleted_token(instance, **kwargs):
+    transaction.on_commit(lambda: reset_token_users(instance.key))
+
+
+@receiver(post_save, sender=CustomUser)
+def reset_user_tokens(instance, created, **kwargs):
+    if created:
+        return
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    if keys:
+        transaction.on_commit(lambda: reset_token_users(*keys))
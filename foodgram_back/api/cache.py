@@ -0,0 +1,101 @@
+from collections import Counter
+from urllib.parse import urlencode
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import Recipe, Tag
+
+SHOPPING_CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+SHOPPING_LIST_KEY = 'shopping_list:{user_id}:{version}:{format}'
+RECIPES_VERSION_KEY = 'recipes_version'
+RECIPES_RESPONSE_KEY = 'recipes_response:{version}:{path}?{query}'
+
+response_cache_stats = Counter()
+
+
+def get_shopping_cart_version(user_id):
+    """Текущая версия корзины пользователя."""
+    return cache.get_or_set(
+        SHOPPING_CART_VERSION_KEY.format(user_id=user_id),
+        lambda: uuid4().hex,
+        None
+    )
+
+
+def bump_shopping_cart_version(*user_ids):
+    """
+    Сброс версии корзины.
+    Ранее отрисованные списки покупок перестают находиться в кэше.
+    """
+    cache.delete_many([
+        SHOPPING_CART_VERSION_KEY.format(user_id=user_id)
+        for user_id in user_ids
+    ])
+
+
+def get_shopping_list_key(user_id, format):
+    return SHOPPING_LIST_KEY.format(
+        user_id=user_id,
+        version=get_shopping_cart_version(user_id),
+        format=format
+    )
+
+
+def cache_stream(key, chunks):
+    """
+    Отдает части ответа по мере генерации и после последней
+    части сохраняет весь ответ в кэш. Части могут быть строками
+    или байтами.
+    """
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    separator = b'' if content and isinstance(content[0], bytes) else ''
+    cache.set(
+        key, separator.join(content), settings.SHOPPING_LIST_CACHE_TIMEOUT
+    )
+
+
+def get_recipes_response_key(path, query_params):
+    """
+    Ключ кэша ответа по рецептам.
+    Параметры запроса сортируются, поэтому ?tags=a&tags=b и
+    ?tags=b&tags=a попадают в одну запись.
+    """
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, values in query_params.lists()
+            for value in values
+        )
+    )
+    version = cache.get_or_set(
+        RECIPES_VERSION_KEY, lambda: uuid4().hex, None
+    )
+    return RECIPES_RESPONSE_KEY.format(
+        version=version, path=path, query=query
+    )
+
+
+def bump_recipes_version():
+    cache.delete(RECIPES_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+def reset_recipes_responses(**kwargs):
+    transaction.on_commit(bump_recipes_version)
+
+
+@receiver(pre_delete, sender=Recipe)
+def reset_deleted_recipe_shopping_lists(instance, **kwargs):
+    user_ids = list(
+        instance.shopping_cart.values_list('user_id', flat=True)
+    )
+    transaction.on_commit(lambda: bump_shopping_cart_version(*user_ids))
@@ -1,11 +1,15 @@
+from django.db.models import Exists, OuterRef
 from rest_framework import filters
 
-
-class IngredientsFilterBackend(filters.SearchFilter):
-    search_param = 'name'
+from recipes.models import Recipe
 
 
 class RecipeFilterBackend(filters.BaseFilterBackend):
+    """
+    Фильтрация рецептов.
+    Каждое условие не размножает строки рецептов,
+    поэтому DISTINCT не нужен.
+    """
 
     def filter_queryset(self, request, queryset, view):
         is_favorited = request.query_params.get('is_favorited')
@@ -13,9 +17,15 @@ class RecipeFilterBackend(filters.BaseFilterBackend):
             'is_in_shopping_cart'
         )
         recipes_author = request.query_params.get('author')
-        recipes_tags = request.query_params.getlist('tags')
+        recipes_tags = [
+            slug for slug in request.query_params.getlist('tags') if slug
+        ]
         review_queryset = queryset
 
+        if '1' in (is_favorited, is_in_shopping_cart):
+            if not request.user.is_authenticated:
+                return review_queryset.none()
+
         if is_favorited == '1':
             review_queryset = review_queryset.filter(
                 favorite_recipes__user=request.user
@@ -31,10 +41,19 @@ class RecipeFilterBackend(filters.BaseFilterBackend):
                 author=recipes_author
             )
 
-        if recipes_tags is not None:
-            regular_tags = '|'.join(recipes_tags)
+        if recipes_tags:
             review_queryset = review_queryset.filter(
-                tags__slug__regex=regular_tags
+                Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe=OuterRef('pk'),
+                        tag__slug__in=recipes_tags
+                    )
+                )
+            )
+
+        if request.query_params.get('ordering') == 'popular':
+            review_queryset = review_queryset.order_by(
+                '-favorites_count', '-pk'
             )
 
-        return review_queryset.distinct()
+        return review_queryset
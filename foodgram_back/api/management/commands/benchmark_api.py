@@ -0,0 +1,380 @@
+import json
+import math
+import statistics
+import time
+from datetime import datetime
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import bump_shopping_cart_version
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import CustomUser
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAA'
+    'CVBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNo'
+    'AAAAggCByxOyYQAAAABJRU5ErkJggg=='
+)
+PASSWORDS = ('Benchmark-password-1', 'Benchmark-password-2')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер количества запросов к базе, задержки p50/p95 '
+        'и пропускной способности эндпоинтов API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--email',
+            help='Пользователь для авторизованных запросов, по умолчанию '
+                 'пользователь с самой большой корзиной.'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш Django перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--cart-size', type=int,
+            help='Замерить выгрузку списка покупок во всех форматах '
+                 'для временного пользователя с корзиной из N рецептов.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='Файл с результатами для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        user = self.get_user(options['email'])
+        recipe = Recipe.objects.exclude(author=user).first()
+        recipe_ids = list(
+            Recipe.objects.exclude(author=user).values_list(
+                'pk', flat=True
+            )[:6]
+        )
+        author_ids = list(
+            CustomUser.objects.filter(recipes__isnull=False).exclude(
+                pk=user.pk
+            ).distinct().values_list('pk', flat=True)[:6]
+        )
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or tag is None or ingredient is None:
+            raise CommandError(
+                'Недостаточно данных, запустите generate_data.'
+            )
+        self.anonymous = APIClient(SERVER_NAME='localhost')
+        self.client = APIClient(SERVER_NAME='localhost')
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        author_id = recipe.author_id
+        search = ingredient.name[:2]
+        all_tags = '&'.join(
+            f'tags={slug}'
+            for slug in Tag.objects.values_list('slug', flat=True)
+        )
+        reads = (
+            ('users-list', '/api/users/'),
+            ('users-me', '/api/users/me/'),
+            ('users-detail', f'/api/users/{author_id}/'),
+            ('users-subscriptions', '/api/users/subscriptions/'),
+            ('tags-list', '/api/tags/'),
+            ('tags-detail', f'/api/tags/{tag.pk}/'),
+            ('ingredients-list', '/api/ingredients/'),
+            ('ingredients-search', f'/api/ingredients/?name={search}'),
+            ('ingredients-detail', f'/api/ingredients/{ingredient.pk}/'),
+            ('recipes-list', '/api/recipes/'),
+            ('recipes-list-tags', f'/api/recipes/?tags={tag.slug}'),
+            ('recipes-list-tags-all', f'/api/recipes/?{all_tags}'),
+            ('recipes-list-favorited', '/api/recipes/?is_favorited=1'),
+            ('recipes-list-popular', '/api/recipes/?ordering=popular'),
+            ('recipes-detail', f'/api/recipes/{recipe.pk}/'),
+            ('download-shopping-cart',
+             '/api/recipes/download_shopping_cart/'),
+            ('download-shopping-cart-csv',
+             '/api/recipes/download_shopping_cart/?format=csv'),
+            ('download-shopping-cart-json',
+             '/api/recipes/download_shopping_cart/?format=json'),
+        )
+        toggles = (
+            ('favorite', f'/api/recipes/{recipe.pk}/favorite/', None),
+            ('shopping-cart', f'/api/recipes/{recipe.pk}/shopping_cart/',
+             None),
+            ('subscribe', f'/api/users/{author_id}/subscribe/', None),
+            ('bulk-favorite', '/api/recipes/favorite/', {'ids': recipe_ids}),
+            ('bulk-shopping-cart', '/api/recipes/shopping_cart/',
+             {'ids': recipe_ids}),
+            ('bulk-subscribe', '/api/users/subscribe/', {'ids': author_ids}),
+        )
+        results = {}
+        for name, url in reads:
+            results[name] = self.measure(self.client, 'get', url)
+        for name in ('recipes-list', 'recipes-detail'):
+            url = dict(reads)[name]
+            results[f'{name}-anonymous'] = self.measure(
+                self.anonymous, 'get', url
+            )
+        for name, url, data in toggles:
+            self.client.delete(url, data, format='json')
+            results[f'{name}-create'], results[f'{name}-destroy'] = (
+                self.measure_toggle(url, data)
+            )
+        results.update(self.measure_recipe_changes(user, tag, ingredient))
+        results.update(self.measure_accounts())
+        if options['cart_size']:
+            results.update(self.measure_downloads(options['cart_size']))
+        report = {
+            'database': connection.vendor,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'iterations': options['iterations'],
+            'cold': options['cold'],
+            'endpoints': results,
+        }
+        self.print_report(results, self.load_baseline(options['compare']))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def get_user(self, email):
+        if email is not None:
+            user = CustomUser.objects.filter(email=email).first()
+        else:
+            user = CustomUser.objects.annotate(
+                cart_size=Count('shopping_cart')
+            ).order_by('-cart_size', 'pk').first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        return user
+
+    def request(self, client, method, url, data=None):
+        if self.options['cold']:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data, format='json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, len(queries), elapsed
+
+    def summarize(self, method, url, samples):
+        timings = [elapsed for _, _, elapsed in samples]
+        return {
+            'method': method.upper(),
+            'url': url,
+            'status': samples[-1][0],
+            'queries': statistics.median(
+                queries for _, queries, _ in samples
+            ),
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+            'rps': round(len(timings) / sum(timings), 1),
+        }
+
+    def measure(self, client, method, url):
+        for _ in range(self.options['warmup']):
+            self.request(client, method, url)
+        samples = [
+            self.request(client, method, url)
+            for _ in range(self.options['iterations'])
+        ]
+        return self.summarize(method, url, samples)
+
+    def measure_toggle(self, url, data=None):
+        """Поочередные добавление и удаление одной связи."""
+        created = []
+        destroyed = []
+        for _ in range(self.options['iterations']):
+            created.append(self.request(self.client, 'post', url, data))
+            destroyed.append(self.request(self.client, 'delete', url, data))
+        return (
+            self.summarize('post', url, created),
+            self.summarize('delete', url, destroyed),
+        )
+
+    def measure_recipe_changes(self, user, tag, ingredient):
+        """Создание, изменение и удаление рецепта."""
+        data = {
+            'name': 'Рецепт для замера',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [tag.pk],
+            'ingredients': [{'id': ingredient.pk, 'amount': 100}],
+            'image': IMAGE,
+        }
+        samples = {'create': [], 'partial-update': [], 'destroy': []}
+        for _ in range(self.options['iterations']):
+            samples['create'].append(
+                self.request(self.client, 'post', '/api/recipes/', data)
+            )
+            url = '/api/recipes/{}/'.format(
+                Recipe.objects.filter(author=user).latest('pk').pk
+            )
+            samples['partial-update'].append(self.request(
+                self.client, 'patch', url, {'cooking_time': 20}
+            ))
+            samples['destroy'].append(
+                self.request(self.client, 'delete', url)
+            )
+        methods = {
+            'create': 'post', 'partial-update': 'patch', 'destroy': 'delete'
+        }
+        return {
+            f'recipes-{name}': self.summarize(
+                methods[name],
+                '/api/recipes/' if name == 'create' else '/api/recipes/{id}/',
+                samples[name]
+            )
+            for name in samples
+        }
+
+    def measure_accounts(self):
+        """
+        Регистрация, получение и удаление токена и смена пароля.
+        Созданные для замера пользователи удаляются.
+        """
+        urls = {
+            'users-create': ('post', '/api/users/'),
+            'token-login': ('post', '/api/auth/token/login/'),
+            'users-set-password': ('post', '/api/users/set_password/'),
+            'token-logout': ('post', '/api/auth/token/logout/'),
+        }
+        samples = {name: [] for name in urls}
+        user_ids = []
+        try:
+            for _ in range(self.options['iterations']):
+                username = f'benchmark-{uuid4().hex[:12]}'
+                email = f'{username}@example.com'
+                samples['users-create'].append(self.request(
+                    self.anonymous, 'post', '/api/users/', {
+                        'username': username,
+                        'email': email,
+                        'first_name': 'Имя',
+                        'last_name': 'Фамилия',
+                        'password': PASSWORDS[0],
+                    }
+                ))
+                user_ids.append(
+                    CustomUser.objects.get(username=username).pk
+                )
+                samples['token-login'].append(self.request(
+                    self.anonymous, 'post', '/api/auth/token/login/',
+                    {'email': email, 'password': PASSWORDS[0]}
+                ))
+                client = APIClient(SERVER_NAME='localhost')
+                client.credentials(HTTP_AUTHORIZATION='Token {}'.format(
+                    Token.objects.get(user_id=user_ids[-1]).key
+                ))
+                samples['users-set-password'].append(self.request(
+                    client, 'post', '/api/users/set_password/', {
+                        'current_password': PASSWORDS[0],
+                        'new_password': PASSWORDS[1],
+                    }
+                ))
+                samples['token-logout'].append(self.request(
+                    client, 'post', '/api/auth/token/logout/'
+                ))
+        finally:
+            CustomUser.objects.filter(pk__in=user_ids).delete()
+        return {
+            name: self.summarize(*urls[name], samples[name])
+            for name in urls
+        }
+
+    def measure_downloads(self, cart_size):
+        """
+        Выгрузка списка покупок в каждом формате: со сборкой списка
+        после сброса версии корзины и из кэша.
+        """
+        recipe_ids = list(
+            Recipe.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            )[:cart_size]
+        )
+        if len(recipe_ids) < cart_size:
+            raise CommandError(
+                f'Для корзины нужно {cart_size} рецептов, '
+                f'в базе {len(recipe_ids)}.'
+            )
+        username = f'benchmark-{uuid4().hex[:12]}'
+        user = CustomUser.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password=PASSWORDS[0],
+            first_name='Имя',
+            last_name='Фамилия'
+        )
+        results = {}
+        try:
+            ShoppingCart.objects.bulk_create(
+                ShoppingCart(user=user, recipe_id=pk) for pk in recipe_ids
+            )
+            rebuild_shopping_lists([user.pk])
+            client = APIClient(SERVER_NAME='localhost')
+            client.credentials(HTTP_AUTHORIZATION='Token {}'.format(
+                Token.objects.create(user=user).key
+            ))
+            for file_format in ('txt', 'csv', 'json', 'pdf'):
+                url = (
+                    '/api/recipes/download_shopping_cart/'
+                    f'?format={file_format}'
+                )
+                name = f'download-{cart_size}-{file_format}'
+                samples = []
+                for _ in range(self.options['iterations']):
+                    bump_shopping_cart_version(user.pk)
+                    samples.append(self.request(client, 'get', url))
+                results[name] = self.summarize('get', url, samples)
+                results[f'{name}-cached'] = self.measure(client, 'get', url)
+        finally:
+            ShoppingCart.objects.filter(user=user).delete()
+            user.delete()
+        return results
+
+    def load_baseline(self, path):
+        if path is None:
+            return {}
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)['endpoints']
+
+    def print_report(self, results, baseline):
+        self.stdout.write(
+            f'{"endpoint":<32}{"status":>7}{"queries":>9}'
+            f'{"p50 ms":>10}{"p95 ms":>10}{"rps":>9}'
+        )
+        for name, result in results.items():
+            line = (
+                f'{name:<32}{result["status"]:>7}{result["queries"]:>9}'
+                f'{result["p50_ms"]:>10.2f}{result["p95_ms"]:>10.2f}'
+                f'{result["rps"]:>9.1f}'
+            )
+            previous = baseline.get(name)
+            if previous:
+                change = (
+                    result['p50_ms'] / previous['p50_ms'] - 1
+                    if previous['p50_ms'] else 0
+                )
+                line += (
+                    f'  p50 {change:+.0%}, '
+                    f'queries {result["queries"] - previous["queries"]:+}'
+                )
+            self.stdout.write(line)
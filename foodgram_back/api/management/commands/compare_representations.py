@@ -0,0 +1,99 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение ответов быстрого пути без сериализаторов с ответами '
+        'сериализаторов: побайтовое совпадение и время ответа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument(
+            '--email',
+            help='Пользователь для авторизованных запросов, по умолчанию '
+                 'пользователь с самым большим избранным.'
+        )
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['email'])
+        tag = Tag.objects.first()
+        recipe = Recipe.objects.first()
+        if tag is None or recipe is None:
+            raise CommandError(
+                'Недостаточно данных, запустите generate_data.'
+            )
+        anonymous = APIClient(SERVER_NAME='localhost')
+        client = APIClient(SERVER_NAME='localhost')
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        urls = (
+            '/api/tags/',
+            '/api/recipes/',
+            '/api/recipes/?page=2&limit=10',
+            f'/api/recipes/?tags={tag.slug}',
+            f'/api/recipes/?author={recipe.author_id}',
+            '/api/recipes/?ordering=popular',
+            '/api/recipes/?cursor=',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+        )
+        self.stdout.write(
+            f'{"url":<48}{"user":>6}{"serializer ms":>15}'
+            f'{"fast ms":>10}{"speedup":>9}'
+        )
+        mismatches = []
+        for url in urls:
+            for name, api_client in (('anon', anonymous), ('auth', client)):
+                expected, serializer_ms = self.measure(
+                    api_client, url, False, options['iterations']
+                )
+                content, fast_ms = self.measure(
+                    api_client, url, True, options['iterations']
+                )
+                if content != expected:
+                    mismatches.append(f'{name} {url}')
+                self.stdout.write(
+                    f'{url:<48}{name:>6}{serializer_ms:>15.2f}'
+                    f'{fast_ms:>10.2f}{serializer_ms / fast_ms:>8.1f}x'
+                )
+        if mismatches:
+            raise CommandError(
+                'Ответы отличаются: ' + ', '.join(mismatches)
+            )
+        self.stdout.write(self.style.SUCCESS('Ответы совпадают.'))
+
+    def get_user(self, email):
+        if email is not None:
+            user = CustomUser.objects.filter(email=email).first()
+        else:
+            user = CustomUser.objects.annotate(
+                favorites=Count('favorite_recipes')
+            ).order_by('-favorites', 'pk').first()
+        if user is None:
+            raise CommandError('Пользователь не найден.')
+        return user
+
+    def measure(self, client, url, fast, iterations):
+        """Содержимое ответа и медианное время без кэша ответов."""
+        timings = []
+        with override_settings(
+            API_FAST_REPRESENTATIONS=fast, RECIPE_RESPONSE_CACHE_TIMEOUT=0
+        ):
+            for _ in range(max(iterations, 1)):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise CommandError(f'{url}: статус {response.status_code}.')
+        return response.content, statistics.median(timings) * 1000
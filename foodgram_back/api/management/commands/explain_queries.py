@@ -0,0 +1,211 @@
+import json
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.test import force_authenticate
+
+from api.mixins import set_user_flags
+from api.pagination import PageLimitPagination
+from api.views import CustomUserViewSet, RecipeViewSet
+from recipes.catalog import ingredient_catalog
+from recipes.models import Recipe, Tag
+from recipes.shopping_list import shopping_list_positions
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN для горячих запросов API. Завершается с ошибкой, '
+        'если план содержит последовательное чтение большой таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Таблицы меньшего размера можно читать целиком.'
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Обновить статистику планировщика перед проверкой.'
+        )
+        parser.add_argument(
+            '--verbose-plans', action='store_true',
+            help='Выводить планы запросов целиком.'
+        )
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.annotate(
+            cart_size=Count('shopping_cart')
+        ).order_by('-cart_size', 'pk').first()
+        tag = Tag.objects.first()
+        author_id = Recipe.objects.values_list(
+            'author_id', flat=True
+        ).first()
+        if user is None or tag is None or author_id is None:
+            raise CommandError(
+                'Недостаточно данных, запустите generate_data.'
+            )
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        feeds = {
+            'recipes-by-author': {'author': author_id},
+            'recipes-by-tag': {'tags': tag.slug},
+            'recipes-favorited': {'is_favorited': '1'},
+            'recipes-in-shopping-cart': {'is_in_shopping_cart': '1'},
+            'recipes-popular': {'ordering': 'popular'},
+        }
+        queries = {}
+        for name, params in feeds.items():
+            sql, params = self.recipe_feed(
+                user, params
+            ).query.sql_with_params()
+            queries[name] = (sql, params, True)
+        page = Recipe.objects.values(
+            'id', 'author_id'
+        )[:PageLimitPagination.page_size]
+        data = {'results': [
+            {'id': row['id'], 'author': {'id': row['author_id']}}
+            for row in page
+        ]}
+        queries.update(self.capture('user-flags', set_user_flags, data, user))
+        queries.update(
+            self.capture('subscriptions', self.subscriptions, user)
+        )
+        ingredient_catalog.all()
+        queries.update(self.capture(
+            'shopping-list', lambda: list(shopping_list_positions(user.pk))
+        ))
+        table_sizes = {}
+        failures = []
+        for name, (sql, params, limited) in queries.items():
+            plan, scanned = self.explain(sql, params, limited)
+            large = [
+                table for table in scanned
+                if self.table_size(table, table_sizes) >= options['min_rows']
+            ]
+            status = 'SEQ SCAN ' + ', '.join(large) if large else 'ok'
+            self.stdout.write(f'{name:<28}{status}')
+            if options['verbose_plans'] or large:
+                self.stdout.write(plan)
+            if large:
+                failures.append(name)
+        if failures:
+            raise CommandError(
+                'Последовательное чтение в запросах: ' + ', '.join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все запросы используют индексы.')
+        )
+
+    def recipe_feed(self, user, params):
+        """Страница ленты с фильтрами, как её строит RecipeViewSet.list."""
+        request = Request(RequestFactory().get('/api/recipes/', params))
+        request.user = user
+        view = RecipeViewSet(
+            request=request, action='list', args=(), kwargs={},
+            format_kwarg=None
+        )
+        if settings.API_FAST_REPRESENTATIONS:
+            queryset = view.get_feed_queryset()
+        else:
+            queryset = view.get_queryset()
+        return view.filter_queryset(
+            queryset
+        )[:PageLimitPagination.page_size]
+
+    def subscriptions(self, user):
+        request = RequestFactory().get('/api/users/subscriptions/')
+        force_authenticate(request, user)
+        response = CustomUserViewSet.as_view(
+            {'get': 'get_subscriptions'}
+        )(request)
+        if response.status_code != 200:
+            raise CommandError(
+                f'Подписки вернули статус {response.status_code}.'
+            )
+
+    def capture(self, name, func, *args):
+        """
+        Запросы, которые выполняет func, с именами name-1, name-2...
+        Запрос с LIMIT считается ограниченным. EXPLAIN, которым
+        пагинатор оценивает количество строк, пропускается.
+        """
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            if not sql.startswith('EXPLAIN'):
+                executed.append((sql, params, ' LIMIT ' in sql))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            func(*args)
+        return {
+            f'{name}-{number}': query
+            for number, query in enumerate(executed, 1)
+        }
+
+    def explain(self, sql, params, limited):
+        """
+        Текст плана и таблицы, которые читаются целиком.
+        SQLite показывает обход по первичному ключу в порядке ORDER BY
+        с LIMIT так же, как полное чтение, такой обход не учитывается.
+        Чтение подзапросов, которые SQLite строит как CO-ROUTINE
+        или MATERIALIZE, тоже не учитывается: их таблицы есть в плане.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return (
+                    json.dumps(plan, indent=2),
+                    list(self.seq_scans(plan[0]['Plan']))
+                )
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                details = [row[-1] for row in cursor.fetchall()]
+                ordered = limited and not any(
+                    'FOR ORDER BY' in detail for detail in details
+                )
+                derived = {
+                    detail.split()[1] for detail in details
+                    if detail.split()[0] in ('CO-ROUTINE', 'MATERIALIZE')
+                }
+                scanned = []
+                for index, detail in enumerate(details):
+                    words = detail.split()
+                    if index == 0 and ordered:
+                        continue
+                    if words[0] == 'SCAN' and 'USING' not in words:
+                        words = [word for word in words if word != 'TABLE']
+                        if words[1] not in derived:
+                            scanned.append(words[1])
+                return '\n'.join(details), scanned
+        raise CommandError(
+            f'EXPLAIN для {connection.vendor} не поддерживается.'
+        )
+
+    def seq_scans(self, node):
+        if node['Node Type'] == 'Seq Scan':
+            yield node['Relation Name']
+        for child in node.get('Plans', ()):
+            yield from self.seq_scans(child)
+
+    def table_size(self, table, sizes):
+        if table not in sizes:
+            if table not in connection.introspection.table_names():
+                sizes[table] = float('inf')
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM '
+                        + connection.ops.quote_name(table)
+                    )
+                    sizes[table] = cursor.fetchone()[0]
+        return sizes[table]
@@ -0,0 +1,194 @@
+import random
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError, call_command
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from api.cache import bump_recipes_version
+from recipes.models import (AmountIngredients, FavoriteRecipes, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from users.models import CustomUser, Subscribe
+
+
+def popularity_weights(size):
+    """Накопленные веса распределения Ципфа: первые элементы популярнее."""
+    return list(accumulate(1 / (rank + 1) for rank in range(size)))
+
+
+def sample(rnd, population, cum_weights, count):
+    """Выборка count разных элементов с учетом весов."""
+    count = min(count, len(population))
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(
+            rnd.choices(population, cum_weights=cum_weights, k=count)
+        )
+    return list(chosen)[:count]
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация пользователей, рецептов, избранного, корзин '
+        'и подписок для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее количество избранных рецептов у пользователя.'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее количество рецептов в корзине пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее количество подписок пользователя.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('pk', flat=True)
+        )
+        self.tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        if not self.ingredient_ids or not self.tag_ids:
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'load_ingrs и load_tags.'
+            )
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(user_ids, options['recipes'])
+            self.create_relations(
+                user_ids, recipe_ids, FavoriteRecipes, 'recipe',
+                options['favorites']
+            )
+            self.create_relations(
+                user_ids, recipe_ids, ShoppingCart, 'recipe',
+                options['cart']
+            )
+            self.create_relations(
+                user_ids, user_ids, Subscribe, 'author',
+                options['subscriptions']
+            )
+            self.reset_sequences()
+        call_command('recount_popularity', stdout=self.stdout)
+        call_command(
+            'rebuild_shopping_lists', users=user_ids, stdout=self.stdout
+        )
+        bump_recipes_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {len(user_ids)} пользователей '
+            f'и {len(recipe_ids)} рецептов.'
+        ))
+
+    def next_pk(self, model):
+        return (model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+
+    def create_users(self, count):
+        start = self.next_pk(CustomUser)
+        password = make_password('synthetic-password')
+        users = [
+            CustomUser(
+                pk=pk,
+                email=f'synthetic{pk}@example.com',
+                username=f'synthetic{pk}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password
+            )
+            for pk in range(start, start + count)
+        ]
+        CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+        return [user.pk for user in users]
+
+    def create_recipes(self, user_ids, count):
+        """
+        Авторы, ингредиенты и теги выбираются по распределению Ципфа:
+        немногие авторы пишут большую часть рецептов, а небольшая
+        часть ингредиентов встречается в большинстве рецептов.
+        Рецепты создаются пачками по batch_size, чтобы миллион рецептов
+        с ингредиентами не держать в памяти целиком.
+        """
+        start = self.next_pk(Recipe)
+        authors = user_ids[:]
+        self.rnd.shuffle(authors)
+        author_weights = popularity_weights(len(authors))
+        ingredients = self.ingredient_ids[:]
+        self.rnd.shuffle(ingredients)
+        ingredient_weights = popularity_weights(len(ingredients))
+        tag_weights = popularity_weights(len(self.tag_ids))
+        for batch_start in range(start, start + count, self.batch_size):
+            recipes = []
+            amounts = []
+            tags = []
+            for pk in range(
+                batch_start, min(batch_start + self.batch_size, start + count)
+            ):
+                recipes.append(Recipe(
+                    pk=pk,
+                    author_id=self.rnd.choices(
+                        authors, cum_weights=author_weights
+                    )[0],
+                    name=f'Рецепт {pk}',
+                    text='Описание рецепта.',
+                    cooking_time=self.rnd.randint(5, 180)
+                ))
+                for ingredient_id in sample(
+                    self.rnd, ingredients, ingredient_weights,
+                    self.rnd.randint(3, 15)
+                ):
+                    amounts.append(AmountIngredients(
+                        recipe_id=pk,
+                        ingredient_id=ingredient_id,
+                        amount=self.rnd.randint(1, 500)
+                    ))
+                for tag_id in sample(
+                    self.rnd, self.tag_ids, tag_weights,
+                    self.rnd.randint(1, 3)
+                ):
+                    tags.append(
+                        Recipe.tags.through(recipe_id=pk, tag_id=tag_id)
+                    )
+            Recipe.objects.bulk_create(recipes)
+            AmountIngredients.objects.bulk_create(
+                amounts, batch_size=self.batch_size
+            )
+            Recipe.tags.through.objects.bulk_create(tags)
+        return list(range(start, start + count))
+
+    def create_relations(self, user_ids, target_ids, model, field, average):
+        """Связи пользователей с популярными объектами встречаются чаще."""
+        targets = target_ids[:]
+        self.rnd.shuffle(targets)
+        weights = popularity_weights(len(targets))
+        relations = []
+        for user_id in user_ids:
+            count = self.rnd.randint(0, average * 2)
+            for target_id in sample(self.rnd, targets, weights, count):
+                if field == 'author' and target_id == user_id:
+                    continue
+                relations.append(
+                    model(user_id=user_id, **{f'{field}_id': target_id})
+                )
+        model.objects.bulk_create(
+            relations, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+    def reset_sequences(self):
+        """Первичные ключи заданы явно, поэтому сдвигаем счетчики."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [CustomUser, Recipe]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,92 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management import BaseCommand
+
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера: параллельные GET запросы '
+        'к эндпоинтам, задержки p50/p95/p99 и пропускная способность. '
+        'Используется для сравнения WSGI и ASGI развертываний.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://localhost:8000',
+            help='Адрес сервера.'
+        )
+        parser.add_argument(
+            '--prefix', default='/api/',
+            help='Префикс API: /api/ или /api/async/.'
+        )
+        parser.add_argument(
+            '--paths', nargs='+',
+            default=['recipes/', 'recipes/?page=2', 'tags/', 'ingredients/'],
+            help='Пути относительно префикса, запрашиваются по кругу.'
+        )
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--token', help='Токен для авторизованных запросов.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для сохранения результатов в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        urls = [
+            options['base_url'].rstrip('/') + options['prefix'] + path
+            for path in options['paths']
+        ]
+
+        def fetch(url):
+            started = time.perf_counter()
+            try:
+                with urlopen(
+                    Request(url, headers=headers), timeout=options['timeout']
+                ) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as error:
+                status = error.code
+            except (URLError, OSError):
+                status = None
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(
+                fetch, islice(cycle(urls), options['requests'])
+            ))
+        elapsed = time.perf_counter() - started
+        timings = [duration for _, duration in samples]
+        errors = sum(1 for status, _ in samples if status != 200)
+        report = {
+            'base_url': options['base_url'],
+            'prefix': options['prefix'],
+            'concurrency': options['concurrency'],
+            'requests': len(samples),
+            'errors': errors,
+            'rps': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'mean_ms': round(statistics.mean(timings) * 1000, 3),
+        }
+        for name, value in report.items():
+            self.stdout.write(f'{name:<14}{value}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
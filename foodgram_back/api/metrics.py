@@ -0,0 +1,225 @@
+import asyncio
+import logging
+from collections import defaultdict
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedTokenAuthentication
+from .cache import response_cache_stats
+
+logger = logging.getLogger(__name__)
+
+METRICS = (
+    ('requests_total', 'requests', 'Количество запросов.'),
+    ('request_queries_total', 'queries', 'Количество SQL запросов.'),
+    ('request_db_seconds_total', 'db', 'Время выполнения SQL запросов.'),
+    ('request_view_seconds_total', 'view',
+     'Время работы представления без SQL запросов.'),
+    ('request_render_seconds_total', 'render', 'Время рендеринга ответа.'),
+    ('request_seconds_total', 'total', 'Полное время обработки запроса.'),
+)
+
+
+class RequestTiming:
+    """
+    Замеры одного запроса.
+    Экземпляр подключается к соединению через execute_wrapper
+    и считает SQL запросы и время их выполнения.
+    """
+
+    def __init__(self, collect_sql):
+        self.collect_sql = collect_sql
+        self.started = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.sql = []
+        self.view_db = 0.0
+        self.view_finished = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started
+            self.queries += 1
+            self.db += duration
+            if self.collect_sql:
+                self.sql.append((duration, sql))
+
+
+class MetricsRegistry:
+    """Накопленные метрики по маршрутам в памяти процесса."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.routes = defaultdict(lambda: defaultdict(float))
+
+    def record(self, route, values):
+        with self.lock:
+            stats = self.routes[route]
+            for name, value in values.items():
+                stats[name] += value
+
+    def render(self):
+        with self.lock:
+            routes = {
+                route: dict(stats) for route, stats in self.routes.items()
+            }
+        lines = []
+        for metric, key, help_text in METRICS:
+            lines.append(f'# HELP foodgram_{metric} {help_text}')
+            lines.append(f'# TYPE foodgram_{metric} counter')
+            for route, stats in sorted(routes.items()):
+                value = stats.get(key, 0)
+                if key in ('requests', 'queries'):
+                    value = int(value)
+                lines.append(f'foodgram_{metric}{{route="{route}"}} {value}')
+        lines.append(
+            '# HELP foodgram_response_cache_total '
+            'Обращения к кэшу ответов по рецептам.'
+        )
+        lines.append('# TYPE foodgram_response_cache_total counter')
+        for result in ('hit', 'miss'):
+            lines.append(
+                f'foodgram_response_cache_total{{result="{result}"}} '
+                f'{response_cache_stats[result]}'
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def get_route(request):
+    """
+    Имя маршрута: вьюсет и действие для представлений DRF,
+    имя URL для остальных.
+    """
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    actions = getattr(match.func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{view_class.__name__}.{action}'
+
+
+class RequestMetricsMiddleware:
+    """
+    Сбор метрик запросов по маршрутам: количество и время SQL
+    запросов, время представления, рендеринга и полное время.
+    Медленные запросы записываются в лог вместе со списком SQL.
+    Под ASGI SQL запросы выполняются в других потоках
+    и в метрики не попадают.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+        timing = self.start(request)
+        with connection.execute_wrapper(timing):
+            response = self.get_response(request)
+        self.finish(request, timing)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await self.get_response(request)
+        timing = self.start(request)
+        response = await self.get_response(request)
+        self.finish(request, timing)
+        return response
+
+    def start(self, request):
+        timing = RequestTiming(
+            collect_sql=settings.REQUEST_METRICS_SLOW_MS is not None
+        )
+        request.metrics_timing = timing
+        return timing
+
+    def finish(self, request, timing):
+        finished = perf_counter()
+        total = finished - timing.started
+        if timing.view_finished is None:
+            timing.view_finished = finished
+            timing.view_db = timing.db
+        route = get_route(request)
+        registry.record(route, {
+            'requests': 1,
+            'queries': timing.queries,
+            'db': timing.db,
+            'view': max(
+                timing.view_finished - timing.started - timing.view_db, 0.0
+            ),
+            'render': finished - timing.view_finished,
+            'total': total,
+        })
+        slow_ms = settings.REQUEST_METRICS_SLOW_MS
+        if slow_ms is not None and total * 1000 >= slow_ms:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.1f мс, %d SQL запросов, '
+                '%.1f мс в базе.\n%s',
+                request.method, request.path, route,
+                total * 1000, timing.queries, timing.db * 1000,
+                '\n'.join(
+                    f'{duration * 1000:.1f} мс: {sql}'
+                    for duration, sql in timing.sql
+                )
+            )
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, 'metrics_timing', None)
+        if timing is not None:
+            timing.view_finished = perf_counter()
+            timing.view_db = timing.db
+        return response
+
+
+def can_view_metrics(request):
+    """
+    Метрики доступны сборщику с токеном REQUEST_METRICS_TOKEN
+    в заголовке Authorization: Bearer и администраторам, вошедшим
+    в админку или передавшим токен API.
+    """
+    token = settings.REQUEST_METRICS_TOKEN
+    if token and constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        return True
+    if request.user.is_staff:
+        return True
+    try:
+        authenticated = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404
+    if not can_view_metrics(request):
+        raise PermissionDenied
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,166 @@
+import json
+from copy import deepcopy
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from recipes.models import FavoriteRecipes, ShoppingCart
+from users.models import Subscribe
+
+from .cache import get_recipes_response_key, response_cache_stats
+
+
+def get_recipes_data(data):
+    """Рецепты в данных ответа list или retrieve."""
+    if 'results' in data:
+        return data['results']
+    return [data]
+
+
+def reset_user_flags(data):
+    for recipe in get_recipes_data(data):
+        recipe['is_favorited'] = False
+        recipe['is_in_shopping_cart'] = False
+        recipe['author']['is_subscribed'] = False
+
+
+def set_user_flags(data, user):
+    """
+    Проставляет флаги пользователя в общих данных рецептов.
+    Флаги загружаются тремя запросами для всех рецептов ответа.
+    """
+    recipes = get_recipes_data(data)
+    recipe_ids = [recipe['id'] for recipe in recipes]
+    author_ids = {recipe['author']['id'] for recipe in recipes}
+    favorited = set(
+        FavoriteRecipes.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    in_shopping_cart = set(
+        ShoppingCart.objects.filter(
+            user=user, recipe_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    subscribed = set(
+        Subscribe.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True)
+    )
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_shopping_cart
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscribed
+        )
+
+
+def cached_response(request, content, etag):
+    """Ответ из кэша или 304, если ETag совпадает с If-None-Match."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    response['Vary'] = 'Accept'
+    return response
+
+
+class SharedResponseCacheMixin:
+    """
+    Кэширование ответов list и retrieve.
+    В кэше хранится ответ анонимному пользователю вместе с ETag,
+    при совпадении If-None-Match возвращается 304.
+    Авторизованным пользователям отдается тот же ответ с их флагами
+    избранного, корзины и подписки, если фильтры не зависят
+    от пользователя.
+    """
+    cached_actions = ('list', 'retrieve')
+    user_filters = ('is_favorited', 'is_in_shopping_cart')
+    response_cache_key = None
+    response_cache_hit = False
+
+    def list(self, request, *args, **kwargs):
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        return super().retrieve(request, *args, **kwargs)
+
+    def is_response_cacheable(self, request):
+        if (
+            self.action not in self.cached_actions
+            or request.accepted_renderer.format != 'json'
+        ):
+            return False
+        if not request.user.is_authenticated:
+            return True
+        return settings.RECIPE_RESPONSE_PERSONALIZATION and not any(
+            request.query_params.get(name) == '1'
+            for name in self.user_filters
+        )
+
+    def get_cached_response(self, request):
+        if not self.is_response_cacheable(request):
+            return None
+        self.response_cache_key = get_recipes_response_key(
+            request.path, request.query_params
+        )
+        cached = cache.get(self.response_cache_key)
+        if cached is None:
+            response_cache_stats['miss'] += 1
+            return None
+        response_cache_stats['hit'] += 1
+        self.response_cache_hit = True
+        content, etag = cached
+        if request.user.is_authenticated:
+            data = json.loads(content)
+            set_user_flags(data, request.user)
+            return Response(data)
+        return cached_response(request, content, etag)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.response_cache_key is None:
+            return response
+        if self.response_cache_hit:
+            response['X-Cache'] = 'HIT'
+            return response
+        if (
+            not isinstance(response, Response)
+            or response.status_code != 200
+        ):
+            return response
+        if request.user.is_authenticated:
+            data = deepcopy(response.data)
+            reset_user_flags(data)
+            content = response.accepted_renderer.render(
+                data, response.accepted_media_type, response.renderer_context
+            )
+        else:
+            content = response.render().content
+        etag = '"%s"' % md5(content).hexdigest()
+        cache.set(
+            self.response_cache_key,
+            (content, etag),
+            settings.RECIPE_RESPONSE_CACHE_TIMEOUT
+        )
+        if not request.user.is_authenticated:
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match and etag in parse_etags(if_none_match):
+                response = HttpResponseNotModified()
+            response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        return response
@@ -1,6 +1,97 @@
-from rest_framework.pagination import PageNumberPagination
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор с кэшируемым количеством объектов.
+    Количество хранится в кэше по SQL запросу фильтрации.
+    На PostgreSQL для больших выборок вместо COUNT используется
+    оценка планировщика.
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.order_by().values('pk')
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        cache_key = 'pagination_count:' + sha1(
+            f'{queryset.db}:{sql}:{params}'.encode()
+        ).hexdigest()
+        count = cache.get(cache_key)
+        if count is None:
+            count = self.estimate_count(queryset.db, sql, params)
+            if count is None:
+                count = queryset.count()
+            cache.set(
+                cache_key, count, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        return count
+
+    def estimate_count(self, using, sql, params):
+        """
+        Оценка количества строк планировщиком PostgreSQL.
+        Возвращает None, если оценка недоступна или меньше порога.
+        """
+        threshold = settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        connection = connections[using]
+        if threshold is None or connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            estimate = int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
+        if estimate < threshold:
+            return None
+        return estimate
+
+
+class KeysetPagination(CursorPagination):
+    """Постраничный вывод по ключу без COUNT и OFFSET."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
 
 
 class PageLimitPagination(PageNumberPagination):
+    """
+    Постраничный вывод по номеру страницы.
+    С параметром ?cursor= переключается на KeysetPagination, которая
+    сортирует по ключу, поэтому другая сортировка с курсором
+    не принимается.
+    """
+    django_paginator_class = CachedCountPaginator
     page_size = 6
     page_size_query_param = 'limit'
+    cursor_query_param = KeysetPagination.cursor_query_param
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            if queryset.query.order_by:
+                raise ValidationError({
+                    self.cursor_query_param: 'Выбранная сортировка не '
+                    'поддерживается при выводе по курсору.'
+                })
+            self.keyset_paginator = KeysetPagination()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.keyset_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
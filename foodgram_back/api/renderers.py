@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер списка покупок.
+    Формат выбирается параметром ?format=, строки списка
+    отдаются по частям методом stream().
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Ответы с ошибками отдаются в JSON."""
+        return JSONRenderer().render(data)
+
+    def get_filename(self):
+        return f'shopping_list.{self.format}'
+
+    def stream(self, positions):
+        raise NotImplementedError('stream() должен быть переопределен.')
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, positions):
+        for position in positions:
+            yield (
+                f' *  {position["name"].title()}'
+                f' ({position["measurement_unit"]})'
+                f' - {position["total_amount"]}' + '\n'
+            )
+
+
+class Echo:
+    """Файлоподобный объект, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, positions):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for position in positions:
+            yield writer.writerow((
+                position['name'],
+                position['measurement_unit'],
+                position['total_amount']
+            ))
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, positions):
+        separator = '['
+        for position in positions:
+            yield separator + json.dumps({
+                'name': position['name'],
+                'measurement_unit': position['measurement_unit'],
+                'amount': position['total_amount']
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    """
+    Список покупок в PDF. Для кириллицы используется шрифт DejaVu
+    из data/fonts. reportlab собирает документ целиком, поэтому
+    он отдается одной частью.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    font_name = 'DejaVuSans'
+    font_size = 11
+    line_height = 6 * mm
+    margin = 20 * mm
+
+    def register_font(self):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(
+                self.font_name,
+                settings.BASE_DIR / 'data' / 'fonts' / 'DejaVuSans.ttf'
+            ))
+
+    def stream(self, positions):
+        self.register_font()
+        buffer = io.BytesIO()
+        canvas = Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - self.margin
+
+        def write(line, size=self.font_size):
+            nonlocal y
+            if y < self.margin:
+                canvas.showPage()
+                y = height - self.margin
+            canvas.setFont(self.font_name, size)
+            canvas.drawString(self.margin, y, line)
+            y -= self.line_height
+
+        write('Список покупок', size=self.font_size + 5)
+        y -= self.line_height / 2
+        for position in positions:
+            text = (
+                f'{position["name"].title()} '
+                f'({position["measurement_unit"]}) - '
+                f'{position["total_amount"]}'
+            )
+            for line in simpleSplit(
+                text, self.font_name, self.font_size,
+                width - 2 * self.margin
+            ):
+                write(line)
+        canvas.save()
+        yield buffer.getvalue()
@@ -0,0 +1,25 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from recipes.catalog import ingredient_catalog
+from recipes.models import Ingredient
+
+
+def search_ingredient_ids(name, limit):
+    """
+    Поиск ингредиентов по названию: сначала начинающиеся с name,
+    затем содержащие name, не больше limit результатов.
+    На PostgreSQL поиск обслуживает триграммный GIN индекс,
+    на остальных базах - справочник ингредиентов в памяти.
+    """
+    if connection.vendor != 'postgresql':
+        return ingredient_catalog.search(name, limit)
+    return list(
+        Ingredient.objects.filter(name__icontains=name).annotate(
+            is_prefix=Case(
+                When(name__istartswith=name, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField()
+            )
+        ).order_by('is_prefix', 'name').values_list('pk', flat=True)[:limit]
+    )
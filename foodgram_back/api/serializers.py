@@ -1,25 +1,90 @@
 import base64
-
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+import binascii
+from hashlib import sha256
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+
+from recipes.catalog import ingredient_catalog
+from recipes.images import schedule_thumbnails
+from recipes.models import AmountIngredients, Ingredient, Recipe, Tag
+from recipes.shopping_list import change_recipe_in_shopping_lists
+from users.models import CustomUser
 
-from recipes.models import (AmountIngredients, FavoriteRecipes, Ingredient,
-                            Recipe, ShoppingCart, Tag)
-from users.models import CustomUser, Subscribe
+from .representations import thumbnail_urls
 
 
 class Base64ImageField(serializers.ImageField):
+    """
+    Изображение в формате base64.
+    Декодируется по частям с ограничением размера, файл называется
+    по хэшу содержимого, поэтому одинаковые загрузки не дублируются.
+    """
+    chunk_size = 4 * 64 * 1024
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            if not ext.isalnum():
+                raise serializers.ValidationError(
+                    'Неподдерживаемый формат изображения.'
+                )
+            if len(imgstr) // 4 * 3 > settings.RECIPE_IMAGE_MAX_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения превышает допустимый.'
+                )
+            file = SpooledTemporaryFile(max_size=self.chunk_size)
+            digest = sha256()
+            try:
+                for start in range(0, len(imgstr), self.chunk_size):
+                    chunk = base64.b64decode(
+                        imgstr[start:start + self.chunk_size], validate=True
+                    )
+                    digest.update(chunk)
+                    file.write(chunk)
+            except binascii.Error:
+                raise serializers.ValidationError(
+                    'Некорректная строка base64.'
+                )
+            name = f'{digest.hexdigest()}.{ext}'
+            upload_to = Recipe._meta.get_field('image').upload_to
+            if default_storage.exists(upload_to + name):
+                return upload_to + name
+            file.seek(0)
+            data = File(file, name=name)
 
         return super().to_internal_value(data)
 
 
+class ThumbnailsField(serializers.ReadOnlyField):
+    """Ссылки на WebP миниатюры изображения рецепта."""
+
+    def to_representation(self, value):
+        return thumbnail_urls(value.name, self.context.get('request'))
+
+
+def get_recipes_limit(request):
+    """Проверенное значение параметра recipes_limit."""
+    recipes_limit = request.query_params.get('recipes_limit', 3)
+    try:
+        recipes_limit = int(recipes_limit)
+    except (TypeError, ValueError):
+        recipes_limit = -1
+    if recipes_limit < 0:
+        raise serializers.ValidationError(
+            {'recipes_limit': 'recipes_limit должно быть целым '
+                              'неотрицательным числом.'}
+        )
+    return recipes_limit
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
@@ -29,13 +94,31 @@ class CustomUserSerializer(UserSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
         return user.subscriber.filter(author=obj).exists()
 
 
-class SubscribeSerializer(CustomUserSerializer):
+class UniqueRelationMixin:
+    """
+    Ошибка повторного создания связи.
+    Повтор определяется по нарушению уникального ограничения
+    при вставке, а не отдельным запросом перед ней.
+    """
+    duplicate_message = None
+
+    def duplicate_error(self):
+        return serializers.ValidationError(
+            {api_settings.NON_FIELD_ERRORS_KEY: [self.duplicate_message]},
+            code='unique'
+        )
+
+
+class SubscribeSerializer(UniqueRelationMixin, CustomUserSerializer):
+    duplicate_message = 'Нельзя подписаться на пользователя дважды.'
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.SerializerMethodField()
 
@@ -50,29 +133,23 @@ class SubscribeSerializer(CustomUserSerializer):
         )
 
     def get_recipes(self, obj):
-        recipes_limit = int(
-            self.context['request'].query_params.get('recipes_limit', 3)
-        )
-        recipes = obj.recipes.all()
-        if isinstance(recipes_limit, int):
-            serializer = SmallRecipeSerializer(
-                recipes[:recipes_limit], many=True)
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
         else:
-            raise serializers.ValidationError(
-                "recipes_limit должно быть  целым числом.")
-        return serializer.data
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is None:
+                recipes_limit = get_recipes_limit(self.context['request'])
+            recipes = obj.recipes.all()[:recipes_limit]
+        return SmallRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
     def validate(self, data):
         author = self.instance
         user = self.context['request'].user
-        if Subscribe.objects.filter(author=author, user=user).exists():
-            raise serializers.ValidationError(
-                detail='Нельзя подписаться на пользователя дважды.',
-                code=status.HTTP_400_BAD_REQUEST
-            )
         if user == author:
             raise serializers.ValidationError(
                 detail='Нельзя подписаться на самого себя.',
@@ -81,6 +158,15 @@ class SubscribeSerializer(CustomUserSerializer):
         return data
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Список идентификаторов для массовых операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_IDS
+    )
+
+
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор тегов."""
 
@@ -99,7 +185,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class AmountIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиентов в рецепт."""
-    id = serializers.IntegerField()
+    id = serializers.IntegerField(source='ingredient_id')
 
     class Meta:
         model = AmountIngredients
@@ -124,48 +210,34 @@ class FullAmountIngredientSerializer(serializers.ModelSerializer):
 
 
 class SmallRecipeSerializer(serializers.ModelSerializer):
+    thumbnails = ThumbnailsField(source='image')
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'image', 'name', 'cooking_time',
+            'id', 'image', 'thumbnails', 'name', 'cooking_time',
         )
         read_only_fields = ('name', 'cooking_time')
 
 
-class FavoriteRecipeSerializer(SmallRecipeSerializer):
+class FavoriteRecipeSerializer(UniqueRelationMixin, SmallRecipeSerializer):
     """Сериализатор рецептов."""
-
-    def validate(self, data):
-        recipe = self.instance
-        user = self.context['request'].user
-        if FavoriteRecipes.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                detail='Рецепт уже в избранном.',
-                code=status.HTTP_400_BAD_REQUEST
-            )
-        return data
+    duplicate_message = 'Рецепт уже в избранном.'
 
 
-class ShoppingCartRecipeSerializer(SmallRecipeSerializer):
+class ShoppingCartRecipeSerializer(UniqueRelationMixin, SmallRecipeSerializer):
     """Сериализатор рецептов."""
-
-    def validate(self, data):
-        recipe = self.instance
-        user = self.context['request'].user
-        if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError(
-                detail='Рецепт уже в корзине.',
-                code=status.HTTP_400_BAD_REQUEST
-            )
-        return data
+    duplicate_message = 'Рецепт уже в корзине.'
 
 
 class FullRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор рецептов."""
     author = CustomUserSerializer(read_only=True)
-    ingredients = FullAmountIngredientSerializer(read_only=True, many=True)
+    ingredients = FullAmountIngredientSerializer(
+        source='amount_ingredients', read_only=True, many=True
+    )
     image = Base64ImageField()
+    thumbnails = ThumbnailsField(source='image')
     tags = TagSerializer(many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
@@ -175,45 +247,46 @@ class FullRecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'ingredients', 'is_favorited',
             'is_in_shopping_cart', 'author',
-            'image', 'name', 'text', 'cooking_time',
+            'image', 'thumbnails', 'name', 'text', 'cooking_time',
+            'favorites_count',
         )
+        read_only_fields = ('favorites_count',)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
         return user.favorite_recipes.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
         return user.shopping_cart.filter(recipe=obj).exists()
 
 
-def set_ingredients(data):
+def set_ingredients(recipe, data):
     """Функция для добавления ингридиентов в рецепт."""
-    amount_ingredients = []
-    for new_ingredient in data:
-        ingredient = get_object_or_404(
-            Ingredient,
-            pk=new_ingredient['id']
-        )
-        amount_ingredient, created = (
-            AmountIngredients.objects.get_or_create(
-                ingredient=ingredient,
-                amount=new_ingredient['amount']
-            )
+    AmountIngredients.objects.bulk_create(
+        AmountIngredients(
+            recipe=recipe,
+            ingredient_id=new_ingredient['ingredient_id'],
+            amount=new_ingredient['amount']
         )
-        amount_ingredient.save()
-        amount_ingredients.append(amount_ingredient)
-    return amount_ingredients
+        for new_ingredient in data
+    )
 
 
 class RecordRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор рецептов."""
     author = CustomUserSerializer(read_only=True)
-    ingredients = AmountIngredientSerializer(many=True)
+    ingredients = AmountIngredientSerializer(
+        source='amount_ingredients', many=True
+    )
     image = Base64ImageField(required=False, allow_null=True)
     tags = serializers.PrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True
@@ -226,14 +299,32 @@ class RecordRecipeSerializer(serializers.ModelSerializer):
             'image', 'name', 'text', 'cooking_time',
         )
 
+    def validate_ingredients(self, value):
+        ingredient_ids = [
+            ingredient['ingredient_id'] for ingredient in value
+        ]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиенты в рецепте не должны повторяться.'
+            )
+        missing = ingredient_catalog.missing(ingredient_ids)
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {missing}.'
+            )
+        return value
+
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients = validated_data.pop('ingredients')
+        ingredients = validated_data.pop('amount_ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
-        recipe.ingredients.set(set_ingredients(data=ingredients))
+        set_ingredients(recipe, ingredients)
         recipe.tags.set(tags)
+        transaction.on_commit(lambda: schedule_thumbnails(recipe.image.name))
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
@@ -241,9 +332,22 @@ class RecordRecipeSerializer(serializers.ModelSerializer):
         if 'tags' in validated_data:
             tags_data = validated_data.pop('tags')
             instance.tags.set(tags_data)
-        if 'ingredients' in validated_data:
-            ingredients = validated_data.pop('ingredients')
-            instance.ingredients.set(set_ingredients(data=ingredients))
+        if 'amount_ingredients' in validated_data:
+            ingredients = validated_data.pop('amount_ingredients')
+            old_amounts = dict(
+                instance.amount_ingredients.values_list(
+                    'ingredient_id', 'amount'
+                )
+            )
+            instance.amount_ingredients.all().delete()
+            set_ingredients(instance, ingredients)
+            change_recipe_in_shopping_lists(instance.pk, old_amounts, {
+                ingredient['ingredient_id']: ingredient['amount']
+                for ingredient in ingredients
+            })
 
         instance.save()
+        transaction.on_commit(
+            lambda: schedule_thumbnails(instance.image.name)
+        )
         return instance
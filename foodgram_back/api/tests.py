@@ -0,0 +1,682 @@
+from io import StringIO
+from threading import Barrier, Thread
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import (AsyncClient, TestCase, TransactionTestCase,
+                         override_settings, skipUnlessDBFeature)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from recipes.models import (AmountIngredients, FavoriteRecipes, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import CustomUser, Subscribe
+
+from .filters import RecipeFilterBackend
+from .management.commands import explain_queries
+from .pagination import CachedCountPaginator
+
+
+def create_user(username):
+    return CustomUser.objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        password='Secret-password-1',
+        first_name='Имя',
+        last_name='Фамилия'
+    )
+
+
+def create_recipes(author, count, tags=(), ingredients=()):
+    """Рецепты с тегами и ингредиентами без загрузки изображений."""
+    recipes = [
+        Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text='Описание',
+            cooking_time=10,
+            image='recipes/images/recipe.png'
+        )
+        for number in range(count)
+    ]
+    for recipe in recipes:
+        recipe.tags.set(tags)
+    AmountIngredients.objects.bulk_create(
+        AmountIngredients(recipe=recipe, ingredient=ingredient, amount=10)
+        for recipe in recipes
+        for ingredient in ingredients
+    )
+    return recipes
+
+
+class CachedCountPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        create_recipes(cls.author, 4, tags=[cls.tag])
+        create_recipes(create_user('other'), 3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_below_estimate_threshold_is_exact(self):
+        paginator = CachedCountPaginator(Recipe.objects.all(), 2)
+        self.assertEqual(paginator.count, 7)
+        self.assertEqual(paginator.num_pages, 4)
+        self.assertEqual(
+            CachedCountPaginator(
+                Recipe.objects.filter(tags=self.tag), 2
+            ).count,
+            4
+        )
+
+    @override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=None)
+    def test_count_without_estimate(self):
+        self.assertEqual(
+            CachedCountPaginator(Recipe.objects.all(), 2).count, 7
+        )
+
+    def test_empty_queryset(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Recipe.objects.none(), 2).count, 0
+            )
+
+    def test_list(self):
+        self.assertEqual(CachedCountPaginator([1, 2, 3], 2).count, 3)
+
+    def test_count_is_cached(self):
+        queryset = Recipe.objects.filter(author=self.author)
+        self.assertEqual(CachedCountPaginator(queryset, 2).count, 4)
+        create_recipes(self.author, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedCountPaginator(queryset, 2).count, 4)
+        cache.clear()
+        self.assertEqual(CachedCountPaginator(queryset, 2).count, 5)
+
+    def test_cursor_pages(self):
+        client = APIClient()
+        response = client.get('/api/recipes/', {'cursor': '', 'limit': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 5)
+        response = client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cursor_rejects_popular_ordering(self):
+        response = APIClient().get(
+            '/api/recipes/', {'cursor': '', 'ordering': 'popular'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_recipes_page_count(self):
+        response = APIClient().get('/api/recipes/', {'limit': 5, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+
+class IngredientSearchTests(TestCase):
+    """Поиск ингредиентов: сначала по началу названия, затем по вхождению."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('Ржаная мука', 'Мускатный орех', 'Соль', 'Мука'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/', {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.json()]
+
+    def test_prefix_first(self):
+        self.assertEqual(
+            self.search('му'), ['Мука', 'Мускатный орех', 'Ржаная мука']
+        )
+        self.assertEqual(self.search(' соль '), ['Соль'])
+        self.assertEqual(self.search('сахар'), [])
+
+    def test_without_name(self):
+        self.assertEqual(len(self.search('')), 4)
+
+
+class RecipeListQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        tags = [
+            Tag.objects.create(name=slug, color='#E26C2D', slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        recipes = []
+        for number in range(5):
+            author = create_user(f'author{number}')
+            recipes += create_recipes(author, 12, tags, ingredients)
+            Subscribe.objects.create(user=cls.user, author=author)
+        for recipe in recipes[::3]:
+            FavoriteRecipes.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.large_recipe = recipes[0]
+        cls.small_recipe = create_recipes(
+            create_user('author5'), 1, tags[:1], ingredients[:1]
+        )[0]
+
+    def setUp(self):
+        cache.clear()
+        self.authenticated = APIClient()
+        self.authenticated.force_authenticate(self.user)
+
+    def count_queries(self, client, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def list_queries(self, client, limit):
+        response, queries = self.count_queries(
+            client, '/api/recipes/', {'limit': limit}
+        )
+        self.assertEqual(len(response.data['results']), limit)
+        return queries
+
+    def assert_list_queries_constant(self):
+        for client in (APIClient(), self.authenticated):
+            with self.subTest(authenticated=client is self.authenticated):
+                self.assertEqual(
+                    {
+                        self.list_queries(client, limit)
+                        for limit in (1, 10, 50)
+                    },
+                    {self.list_queries(client, 1)}
+                )
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.assert_list_queries_constant()
+
+    @override_settings(API_FAST_REPRESENTATIONS=False)
+    def test_serializer_query_count_does_not_depend_on_page_size(self):
+        self.assert_list_queries_constant()
+
+    def test_retrieve_query_count_does_not_depend_on_recipe_size(self):
+        for client in (APIClient(), self.authenticated):
+            with self.subTest(authenticated=client is self.authenticated):
+                counts = set()
+                for recipe in (self.small_recipe, self.large_recipe):
+                    response, queries = self.count_queries(
+                        client, f'/api/recipes/{recipe.pk}/'
+                    )
+                    self.assertEqual(response.data['id'], recipe.pk)
+                    counts.add(queries)
+                self.assertEqual(len(counts), 1)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE_TIMEOUT=0)
+class RecipeTagFilterTests(TestCase):
+    """Фильтр по тегам сравнивает слаги целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        breakfast, dinner = (
+            Tag.objects.create(name=slug, color='#E26C2D', slug=slug)
+            for slug in ('breakfast', 'dinner')
+        )
+        author = create_user('author')
+        cls.breakfast = create_recipes(author, 1, [breakfast])[0]
+        cls.dinner = create_recipes(author, 1, [dinner])[0]
+        cls.both = create_recipes(author, 1, [breakfast, dinner])[0]
+        cls.untagged = create_recipes(author, 1)[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ids(self, query):
+        response = self.client.get(f'/api/recipes/?limit=10&{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def filter_sql(self, query):
+        request = Request(APIRequestFactory().get('/api/recipes/?' + query))
+        return str(RecipeFilterBackend().filter_queryset(
+            request, Recipe.objects.all(), view=None
+        ).query)
+
+    def test_substring_does_not_match(self):
+        self.assertEqual(self.get_ids('tags=break'), [])
+        self.assertEqual(self.get_ids('tags=fast'), [])
+
+    def test_tags_are_combined_with_or(self):
+        self.assertEqual(
+            self.get_ids('tags=breakfast&tags=dinner'),
+            [self.both.pk, self.dinner.pk, self.breakfast.pk]
+        )
+        self.assertEqual(
+            self.get_ids('tags=dinner'), [self.both.pk, self.dinner.pk]
+        )
+
+    def test_empty_tags_add_no_condition(self):
+        unfiltered = str(Recipe.objects.all().query)
+        self.assertEqual(self.filter_sql(''), unfiltered)
+        self.assertEqual(self.filter_sql('tags='), unfiltered)
+        self.assertEqual(len(self.get_ids('tags=')), 4)
+
+
+@override_settings(RECIPE_RESPONSE_CACHE_TIMEOUT=0)
+class FastRepresentationsTests(TestCase):
+    """Быстрый путь ленты отдает те же байты, что и сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.tags = [
+            Tag.objects.create(name=slug, color='#E26C2D', slug=slug)
+            for slug in ('breakfast', 'lunch', 'dinner')
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(3)
+        ]
+        cls.author = create_user('author')
+        recipes = create_recipes(
+            cls.author, 5, cls.tags[:2], ingredients[:2]
+        ) + create_recipes(
+            create_user('other'), 8, cls.tags[2:], ingredients[1:]
+        )
+        recipes[0].image = None
+        recipes[0].save()
+        Subscribe.objects.create(user=cls.user, author=cls.author)
+        for recipe in recipes[1::2]:
+            FavoriteRecipes.objects.create(user=cls.user, recipe=recipe)
+            Recipe.objects.filter(pk=recipe.pk).update(favorites_count=1)
+        for recipe in recipes[::3]:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, client, url, fast):
+        cache.clear()
+        with override_settings(API_FAST_REPRESENTATIONS=fast):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_feed_variants(self):
+        authenticated = APIClient()
+        authenticated.force_authenticate(self.user)
+        urls = (
+            '/api/recipes/',
+            '/api/recipes/?page=2&limit=4',
+            f'/api/recipes/?tags={self.tags[0].slug}',
+            f'/api/recipes/?tags={self.tags[0].slug}'
+            f'&tags={self.tags[2].slug}',
+            f'/api/recipes/?author={self.author.pk}',
+            '/api/recipes/?ordering=popular',
+            '/api/recipes/?cursor=&limit=4',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?is_in_shopping_cart=1',
+        )
+        for url in urls:
+            for client in (APIClient(), authenticated):
+                with self.subTest(
+                    url=url, authenticated=client is authenticated
+                ):
+                    self.assertEqual(
+                        self.get(client, url, fast=True),
+                        self.get(client, url, fast=False)
+                    )
+
+    def test_next_cursor_page(self):
+        client = APIClient()
+        url = APIClient().get('/api/recipes/?cursor=&limit=4').data['next']
+        self.assertEqual(
+            self.get(client, url, fast=True),
+            self.get(client, url, fast=False)
+        )
+
+    def test_compare_representations_command(self):
+        stdout = StringIO()
+        call_command(
+            'compare_representations', iterations=1, stdout=stdout
+        )
+        self.assertIn('Ответы совпадают.', stdout.getvalue())
+
+
+class ShoppingListDownloadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        recipes = create_recipes(create_user('author'), 2, (), [ingredient])
+        for recipe in recipes:
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        rebuild_shopping_lists([cls.user.pk])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': file_format}
+        )
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    def test_formats(self):
+        expected = {
+            'txt': ('text/plain; charset=utf-8', 'Мука (г) - 20'.encode()),
+            'csv': ('text/csv; charset=utf-8', 'Мука,г,20'.encode()),
+            'json': (
+                'application/json; charset=utf-8',
+                '"amount": 20'.encode()
+            ),
+            'pdf': ('application/pdf', b'%PDF'),
+        }
+        for file_format, (content_type, fragment) in expected.items():
+            with self.subTest(format=file_format):
+                response, content = self.download(file_format)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertIn(fragment, content)
+                self.assertEqual(
+                    response['Content-Disposition'],
+                    f'attachment; filename="shopping_list.{file_format}"'
+                )
+
+    def test_cached_pdf(self):
+        _, content = self.download('pdf')
+        with self.assertNumQueries(0):
+            response, cached = self.download('pdf')
+        self.assertFalse(response.streaming)
+        self.assertEqual(cached, content)
+
+
+class ExplainQueriesTests(TestCase):
+
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', stdout=StringIO())
+
+    def test_hot_queries_use_indexes(self):
+        user = create_user('reader')
+        tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+        recipes = create_recipes(
+            create_user('author'), 8, [tag], [ingredient]
+        )
+        ShoppingCart.objects.create(user=user, recipe=recipes[0])
+        FavoriteRecipes.objects.create(user=user, recipe=recipes[1])
+        Subscribe.objects.create(user=user, author=recipes[0].author)
+        stdout = StringIO()
+        call_command('explain_queries', analyze=True, stdout=stdout)
+        for name in ('recipes-by-tag', 'user-flags-3', 'subscriptions-3',
+                     'shopping-list-1'):
+            self.assertIn(name, stdout.getvalue())
+        self.assertIn('Все запросы используют индексы.', stdout.getvalue())
+
+    def test_checks_filter_backend(self):
+        """Запросы ленты строятся через RecipeFilterBackend."""
+        recipes = create_recipes(create_user('author'), 2)
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+        ShoppingCart.objects.create(
+            user=create_user('reader'), recipe=recipes[0]
+        )
+
+        def filter_by_author_name(backend, request, queryset, view):
+            return queryset.filter(
+                author__in=CustomUser.objects.filter(first_name='Имя')
+            )
+
+        with patch.object(
+            RecipeFilterBackend, 'filter_queryset', filter_by_author_name
+        ):
+            with self.assertRaisesMessage(CommandError, 'recipes-by-author'):
+                call_command('explain_queries', min_rows=0, stdout=StringIO())
+
+    def test_reports_sequential_scan(self):
+        sql, params = Recipe.objects.filter(
+            text='Описание'
+        ).query.sql_with_params()
+        _, scanned = explain_queries.Command().explain(
+            sql, params, limited=False
+        )
+        self.assertEqual(scanned, [Recipe._meta.db_table])
+
+    def test_postgresql_plan_nodes(self):
+        plan = {
+            'Node Type': 'Hash Join',
+            'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'recipes_tag'},
+                {
+                    'Node Type': 'Hash',
+                    'Plans': [{
+                        'Node Type': 'Index Scan',
+                        'Relation Name': 'recipes_recipe'
+                    }]
+                },
+            ]
+        }
+        self.assertEqual(
+            list(explain_queries.Command().seq_scans(plan)), ['recipes_tag']
+        )
+
+
+class DeletedUserCountersTests(TestCase):
+    """Удаление пользователя уменьшает счетчики избранного и корзин."""
+
+    def setUp(self):
+        self.recipes = create_recipes(create_user('author'), 3)
+        self.readers = [create_user(f'reader{number}') for number in range(3)]
+        for reader in self.readers:
+            for recipe in self.recipes[:2]:
+                FavoriteRecipes.objects.create(user=reader, recipe=recipe)
+            ShoppingCart.objects.create(user=reader, recipe=self.recipes[0])
+        call_command('recount_popularity', stdout=StringIO())
+
+    def counters(self):
+        return list(Recipe.objects.order_by('pk').values_list(
+            'favorites_count', 'in_carts_count'
+        ))
+
+    def assert_recounted(self, expected):
+        self.assertEqual(self.counters(), expected)
+        call_command('recount_popularity', stdout=StringIO())
+        self.assertEqual(self.counters(), expected)
+
+    def test_delete_user(self):
+        self.readers[0].delete()
+        self.assert_recounted([(2, 2), (2, 0), (0, 0)])
+
+    def test_delete_queryset(self):
+        CustomUser.objects.filter(
+            pk__in=[reader.pk for reader in self.readers[1:]]
+        ).delete()
+        self.assert_recounted([(1, 1), (1, 0), (0, 0)])
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class DoubleClickTests(TransactionTestCase):
+    """Одновременные одинаковые запросы создают одну связь."""
+
+    def setUp(self):
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.recipe = create_recipes(self.author, 1)[0]
+
+    def post_concurrently(self, url, times=2):
+        barrier = Barrier(times)
+        statuses = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                statuses.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [Thread(target=post) for _ in range(times)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def test_favorite(self):
+        statuses = self.post_concurrently(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(FavoriteRecipes.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_shopping_cart(self):
+        statuses = self.post_concurrently(
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/'
+        )
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.in_carts_count, 1)
+
+    def test_subscribe(self):
+        statuses = self.post_concurrently(
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        self.assertEqual(statuses, [201, 400])
+        self.assertEqual(Subscribe.objects.count(), 1)
+
+
+class AsyncViewsTests(TransactionTestCase):
+    """
+    Представления /api/async/ работают в пуле потоков со своим
+    соединением с БД, поэтому данные теста должны быть закоммичены.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        self.author = create_user('author')
+        self.recipe = create_recipes(self.author, 1)[0]
+
+    async def test_cache_miss_then_hit(self):
+        response = await self.client.get('/api/async/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['results'][0]['id'], self.recipe.pk)
+        cached = await self.client.get('/api/async/recipes/')
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    async def test_not_modified(self):
+        etag = (await self.client.get('/api/async/recipes/'))['ETag']
+        for _ in range(2):
+            response = await self.client.get(
+                '/api/async/recipes/', **{'If-None-Match': etag}
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    async def test_retrieve(self):
+        response = await self.client.get(
+            f'/api/async/recipes/{self.recipe.pk}/'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], self.recipe.pk)
+        response = await self.client.get('/api/async/recipes/0/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_method_not_allowed(self):
+        response = await self.client.post('/api/async/recipes/')
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
+        response = await self.client.delete(
+            f'/api/async/recipes/{self.recipe.pk}/'
+        )
+        self.assertEqual(response.status_code, 405)
+
+
+@override_settings(REQUEST_METRICS_TOKEN='scrape-token')
+class MetricsAccessTests(TestCase):
+
+    def get(self, **headers):
+        return self.client.get('/api/metrics/', **headers)
+
+    def test_anonymous(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403
+        )
+
+    def test_scrape_token(self):
+        response = self.get(HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('requests_total', response.content.decode())
+
+    @override_settings(REQUEST_METRICS_TOKEN=None)
+    def test_scrape_token_not_configured(self):
+        self.assertEqual(
+            self.get(HTTP_AUTHORIZATION='Bearer None').status_code, 403
+        )
+
+    def test_api_token(self):
+        user = create_user('user')
+        self.assertEqual(
+            self.get(
+                HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}'
+            ).status_code,
+            403
+        )
+        user.is_staff = True
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(
+            self.get(
+                HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=user)}'
+            ).status_code,
+            200
+        )
+
+    def test_admin_session(self):
+        admin = create_user('admin')
+        admin.is_staff = True
+        admin.save()
+        self.client.force_login(admin)
+        self.assertEqual(self.get().status_code, 200)
@@ -1,8 +1,11 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (CustomUserViewSet, FavoriteRecipesViewSet,
-                    IngredientViewSet, RecipeViewSet,
+from . import async_views
+from .metrics import metrics_view
+from .views import (BulkFavoriteRecipesViewSet, BulkShoppingCartRecipesViewSet,
+                    BulkSubscribeViewSet, CustomUserViewSet,
+                    FavoriteRecipesViewSet, IngredientViewSet, RecipeViewSet,
                     ShoppingCartRecipesViewSet, SubscribeViewSet, TagViewSet)
 
 router = routers.DefaultRouter()
@@ -11,7 +14,30 @@ router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 
+bulk_actions = {'post': 'create', 'delete': 'destroy'}
+
 urlpatterns = [
+    path('metrics/', metrics_view, name='metrics'),
+    path('users/subscribe/',
+         BulkSubscribeViewSet.as_view(bulk_actions),
+         name='bulk_subscribe'),
+    path('recipes/favorite/',
+         BulkFavoriteRecipesViewSet.as_view(bulk_actions),
+         name='bulk_favorite'),
+    path('recipes/shopping_cart/',
+         BulkShoppingCartRecipesViewSet.as_view(bulk_actions),
+         name='bulk_shopping_cart'),
+    path('async/tags/', async_views.tag_list, name='async_tags_list'),
+    path('async/tags/<pk>/', async_views.tag_detail,
+         name='async_tags_detail'),
+    path('async/ingredients/', async_views.ingredient_list,
+         name='async_ingredients_list'),
+    path('async/ingredients/<pk>/', async_views.ingredient_detail,
+         name='async_ingredients_detail'),
+    path('async/recipes/', async_views.recipe_list,
+         name='async_recipes_list'),
+    path('async/recipes/<pk>/', async_views.recipe_detail,
+         name='async_recipes_detail'),
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
     path('users/<int:user_id>/subscribe/',
@@ -1,32 +1,85 @@
-from io import StringIO
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import (BooleanField, Count, Exists, F, OuterRef,
+                              Prefetch, Value, Window)
+from django.db.models.functions import RowNumber
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from recipes.catalog import ingredient_catalog
 from recipes.models import (AmountIngredients, FavoriteRecipes, Ingredient,
                             Recipe, ShoppingCart, Tag)
+from recipes.shopping_list import (add_to_shopping_lists,
+                                   remove_from_shopping_lists,
+                                   shopping_list_positions)
+from recipes.units import merge_units
 from users.models import CustomUser, Subscribe
 
-from .filters import IngredientsFilterBackend, RecipeFilterBackend
+from .cache import (bump_shopping_cart_version, cache_stream,
+                    get_shopping_list_key)
+from .filters import RecipeFilterBackend
+from .mixins import SharedResponseCacheMixin
 from .pagination import PageLimitPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (FavoriteRecipeSerializer, FullRecipeSerializer,
-                          IngredientSerializer, RecordRecipeSerializer,
-                          ShoppingCartRecipeSerializer, SubscribeSerializer,
-                          TagSerializer)
+from .renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                        PDFShoppingListRenderer, TextShoppingListRenderer)
+from .representations import RECIPE_FIELDS, recipe_representations
+from .search import search_ingredient_ids
+from .serializers import (BulkIdsSerializer, FavoriteRecipeSerializer,
+                          FullRecipeSerializer, IngredientSerializer,
+                          RecordRecipeSerializer, ShoppingCartRecipeSerializer,
+                          SubscribeSerializer, TagSerializer,
+                          get_recipes_limit)
+
+
+def attach_recipes_preview(authors, recipes_limit):
+    """
+    Первые recipes_limit рецептов каждого автора одним запросом
+    с оконной функцией ROW_NUMBER() OVER (PARTITION BY author).
+    """
+    previews = {author.pk: [] for author in authors}
+    if previews and recipes_limit:
+        numbered = Recipe.objects.filter(
+            author__in=previews
+        ).annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=[F('author_id')],
+                order_by=F('pk').desc()
+            )
+        ).order_by().values(
+            'id', 'name', 'image', 'cooking_time', 'author_id', 'row_number'
+        )
+        sql, params = numbered.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) numbered_recipes '
+            f'WHERE row_number <= %s ORDER BY author_id, row_number',
+            (*params, recipes_limit)
+        )
+        for recipe in recipes:
+            previews[recipe.author_id].append(recipe)
+    for author in authors:
+        author.recipes_preview = previews[author.pk]
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тега."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    fields = ('id', 'name', 'color', 'slug')
+
+    def list(self, request):
+        if not settings.API_FAST_REPRESENTATIONS:
+            return super().list(request)
+        return Response(list(self.get_queryset().values(*self.fields)))
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -34,21 +87,114 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     Вьюсет для ингридиентов.
     Доступны только GET запросы
     на /ingridients/ и /ingridients/{pk}/.
+    Ответы собираются из справочника ингредиентов в памяти процесса.
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (IngredientsFilterBackend, )
-    search_fields = ('^name', 'name')
+    fields = ('id', 'name', 'measurement_unit')
+
+    def list(self, request):
+        name = request.query_params.get('name', '').strip()
+        if name:
+            rows = ingredient_catalog.get_many(
+                search_ingredient_ids(name, settings.INGREDIENT_SEARCH_LIMIT)
+            )
+        else:
+            rows = ingredient_catalog.all()
+        return Response([dict(zip(self.fields, row)) for row in rows])
+
+    def retrieve(self, request, pk):
+        row = ingredient_catalog.get(int(pk)) if pk.isdigit() else None
+        if row is None:
+            raise NotFound
+        return Response(dict(zip(self.fields, row)))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    """Вью-сет для рецептов."""
+class RecipeViewSet(SharedResponseCacheMixin, viewsets.ModelViewSet):
+    """
+    Вью-сет для рецептов.
+    Ответы кэшируются общими для всех пользователей.
+    """
     queryset = Recipe.objects.all()
     serializer_class = FullRecipeSerializer
     filter_backends = (RecipeFilterBackend, )
     pagination_class = PageLimitPagination
     permission_classes = (IsAuthorOrReadOnly, )
 
+    def get_queryset(self):
+        """
+        Рецепты вместе с авторами, тегами и ингредиентами.
+        Для авторизованного пользователя флаги избранного, корзины
+        и подписки на автора вычисляются подзапросами Exists().
+        """
+        user = self.request.user
+        authors = CustomUser.objects.all()
+        if user.is_authenticated:
+            authors = authors.annotate(
+                is_subscribed=Exists(
+                    Subscribe.objects.filter(
+                        user=user, author=OuterRef('pk')
+                    )
+                )
+            )
+        return self.annotate_user_flags(
+            Recipe.objects.prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('pk')),
+                Prefetch(
+                    'amount_ingredients',
+                    queryset=AmountIngredients.objects.select_related(
+                        'ingredient'
+                    ).order_by('pk')
+                ),
+                Prefetch('author', queryset=authors)
+            )
+        )
+
+    def annotate_user_flags(self, queryset):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_favorited=Exists(
+                FavoriteRecipes.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )
+            )
+        )
+
+    def get_feed_queryset(self):
+        """Строки рецептов ленты для быстрых представлений."""
+        queryset = self.annotate_user_flags(Recipe.objects.all())
+        if self.request.user.is_authenticated:
+            return queryset.values(
+                *RECIPE_FIELDS, 'is_favorited', 'is_in_shopping_cart'
+            )
+        return queryset.values(*RECIPE_FIELDS)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Лента рецептов.
+        С API_FAST_REPRESENTATIONS данные собираются из строк .values()
+        без FullRecipeSerializer.
+        """
+        if not settings.API_FAST_REPRESENTATIONS:
+            return super().list(request, *args, **kwargs)
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+        queryset = self.filter_queryset(self.get_feed_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(recipe_representations(list(queryset), request))
+        return self.get_paginated_response(
+            recipe_representations(page, request)
+        )
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'partial_update':
             return RecordRecipeSerializer
@@ -57,38 +203,44 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         return serializer.save(author=self.request.user)
 
+    def perform_update(self, serializer):
+        recipe = serializer.save()
+        bump_shopping_cart_version(
+            *recipe.shopping_cart.values_list('user_id', flat=True)
+        )
+
     @action(
         detail=False,
         methods=['get'],
         url_name='download_shopping_cart',
         url_path='download_shopping_cart',
         permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            JSONShoppingListRenderer,
+            PDFShoppingListRenderer
+        ),
     )
     def download_shopping_cart(self, request):
-        queryset = AmountIngredients.objects.filter(
-            recipe__shopping_cart__user=self.request.user
-        )
-        shopping_cart = queryset.values('ingredient').annotate(
-            total_amount=Sum('amount')
-        )
-        shopping_cart_file = StringIO()
-        for position in shopping_cart:
-            position_ingredient = get_object_or_404(
-                Ingredient,
-                pk=position['ingredient']
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f'; charset={renderer.charset}'
+        cache_key = get_shopping_list_key(request.user.id, renderer.format)
+        content = cache.get(cache_key)
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            shopping_cart = merge_units(
+                shopping_list_positions(request.user.id)
             )
-            position_amount = position['total_amount']
-            shopping_cart_file.write(
-                f' *  {position_ingredient.name.title()}'
-                f' ({position_ingredient.measurement_unit})'
-                f' - {position_amount}' + '\n'
+            response = StreamingHttpResponse(
+                cache_stream(cache_key, renderer.stream(shopping_cart)),
+                content_type=content_type
             )
-        response = HttpResponse(
-            shopping_cart_file.getvalue(),
-            content_type='text'
-        )
         response['Content-Disposition'] = (
-            'attachment; filename="%s"' % 'shopping_list.txt'
+            'attachment; filename="%s"' % renderer.get_filename()
         )
         return response
 
@@ -105,11 +257,16 @@ class CustomUserViewSet(UserViewSet):
             permission_classes=(IsAuthenticated,),
             )
     def get_subscriptions(self, request):
+        recipes_limit = get_recipes_limit(request)
         queryset = self.get_queryset().filter(
             subscribing__user=request.user
-        )
+        ).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).order_by('pk')
         page = self.paginate_queryset(queryset)
         if page is not None:
+            attach_recipes_preview(page, recipes_limit)
             serializer = SubscribeSerializer(page,
                                              context={'request': request},
                                              many=True)
@@ -124,10 +281,19 @@ class SubscribeViewSet(viewsets.ViewSet):
         """Создание подписки."""
         author = get_object_or_404(CustomUser, pk=user_id)
         serializer = SubscribeSerializer(
-            author, data=request.data, context={'request': request}
+            author, data=request.data, context={
+                'request': request,
+                'recipes_limit': get_recipes_limit(request)
+            }
         )
         serializer.is_valid(raise_exception=True)
-        Subscribe.objects.create(user=self.request.user, author=author)
+        try:
+            with transaction.atomic():
+                Subscribe.objects.create(
+                    user=self.request.user, author=author
+                )
+        except IntegrityError:
+            raise serializer.duplicate_error()
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED)
 
@@ -148,13 +314,27 @@ class FavoriteRecipesViewSet(viewsets.ViewSet):
         serializer = FavoriteRecipeSerializer(recipe, data=request.data,
                                               context={'request': request})
         serializer.is_valid(raise_exception=True)
-        FavoriteRecipes.objects.create(user=self.request.user, recipe=recipe)
+        try:
+            with transaction.atomic():
+                FavoriteRecipes.objects.create(
+                    user=self.request.user, recipe=recipe
+                )
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    favorites_count=F('favorites_count') + 1
+                )
+        except IntegrityError:
+            raise serializer.duplicate_error()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, recipe_id):
-        FavoriteRecipes.objects.filter(
-            user=request.user, recipe__id=recipe_id
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = FavoriteRecipes.objects.filter(
+                user=request.user, recipe__id=recipe_id
+            ).delete()
+            if deleted:
+                Recipe.objects.filter(pk=recipe_id).update(
+                    favorites_count=F('favorites_count') - 1
+                )
         return Response(
             {'message': 'Рецепт удален из избранного.'},
             status=status.HTTP_204_NO_CONTENT
@@ -170,14 +350,197 @@ class ShoppingCartRecipesViewSet(viewsets.ViewSet):
         serializer = ShoppingCartRecipeSerializer(
             recipe, data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        ShoppingCart.objects.create(recipe=recipe, user=self.request.user)
+        try:
+            with transaction.atomic():
+                ShoppingCart.objects.create(
+                    recipe=recipe, user=self.request.user
+                )
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    in_carts_count=F('in_carts_count') + 1
+                )
+                add_to_shopping_lists([request.user.id], [recipe.pk])
+        except IntegrityError:
+            raise serializer.duplicate_error()
+        bump_shopping_cart_version(request.user.id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def destroy(self, request, recipe_id):
-        ShoppingCart.objects.filter(
-            user=request.user, recipe__id=recipe_id
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = ShoppingCart.objects.filter(
+                user=request.user, recipe__id=recipe_id
+            ).delete()
+            if deleted:
+                Recipe.objects.filter(pk=recipe_id).update(
+                    in_carts_count=F('in_carts_count') - 1
+                )
+                remove_from_shopping_lists([request.user.id], [recipe_id])
+        bump_shopping_cart_version(request.user.id)
         return Response(
             {'message': 'Рецепт удален из корзины.'},
             status=status.HTTP_204_NO_CONTENT
         )
+
+
+class BulkRelationViewSet(viewsets.ViewSet):
+    """
+    Базовый вьюсет массового добавления и удаления связей
+    пользователя с объектами по списку идентификаторов.
+    Для каждого идентификатора возвращается результат операции.
+    """
+    permission_classes = (IsAuthenticated,)
+    relation_model = None
+    target_model = None
+    target_field = None
+
+    def get_ids(self, request):
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['ids']))
+
+    def get_relations(self, request):
+        return self.relation_model.objects.filter(user=request.user)
+
+    def check_target(self, request, pk):
+        """Код ошибки, если связь с объектом pk создать нельзя."""
+
+    def insert_relations(self, request, ids):
+        """
+        Создает связи и возвращает идентификаторы объектов,
+        для которых связь действительно создана: параллельный
+        запрос мог успеть создать часть связей раньше.
+        """
+        def build(pk):
+            return self.relation_model(
+                user=request.user, **{f'{self.target_field}_id': pk}
+            )
+
+        try:
+            with transaction.atomic():
+                self.relation_model.objects.bulk_create(map(build, ids))
+            return ids
+        except IntegrityError:
+            pass
+        inserted = []
+        for pk in ids:
+            try:
+                with transaction.atomic():
+                    build(pk).save()
+            except IntegrityError:
+                continue
+            inserted.append(pk)
+        return inserted
+
+    def after_create(self, request, ids):
+        pass
+
+    def after_destroy(self, request, ids):
+        pass
+
+    def create(self, request):
+        ids = self.get_ids(request)
+        targets = dict(
+            self.target_model.objects.filter(pk__in=ids).annotate(
+                is_related=Exists(
+                    self.get_relations(request).filter(
+                        **{self.target_field: OuterRef('pk')}
+                    )
+                )
+            ).values_list('pk', 'is_related')
+        )
+        results = {}
+        for pk in ids:
+            if pk not in targets:
+                results[pk] = 'not_found'
+            elif targets[pk]:
+                results[pk] = 'exists'
+            else:
+                results[pk] = self.check_target(request, pk) or 'created'
+        with transaction.atomic():
+            created = self.insert_relations(request, [
+                pk for pk, result in results.items() if result == 'created'
+            ])
+            self.after_create(request, created)
+        for pk in set(results) - set(created):
+            if results[pk] == 'created':
+                results[pk] = 'exists'
+        return Response(
+            {'results': [
+                {'id': pk, 'result': result}
+                for pk, result in results.items()
+            ]},
+            status=status.HTTP_201_CREATED
+        )
+
+    def destroy(self, request):
+        ids = self.get_ids(request)
+        relations = self.get_relations(request).filter(
+            **{f'{self.target_field}__in': ids}
+        )
+        with transaction.atomic():
+            deleted = set(
+                relations.select_for_update().values_list(
+                    f'{self.target_field}_id', flat=True
+                )
+            )
+            relations.delete()
+            self.after_destroy(request, list(deleted))
+        return Response({'results': [
+            {'id': pk, 'result': 'deleted' if pk in deleted else 'not_found'}
+            for pk in ids
+        ]})
+
+
+class BulkSubscribeViewSet(BulkRelationViewSet):
+    """Массовая подписка на авторов."""
+    relation_model = Subscribe
+    target_model = CustomUser
+    target_field = 'author'
+
+    def check_target(self, request, pk):
+        if pk == request.user.pk:
+            return 'self'
+        return None
+
+
+class BulkFavoriteRecipesViewSet(BulkRelationViewSet):
+    """Массовое добавление рецептов в избранное."""
+    relation_model = FavoriteRecipes
+    target_model = Recipe
+    target_field = 'recipe'
+
+    def after_create(self, request, ids):
+        Recipe.objects.filter(pk__in=ids).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+    def after_destroy(self, request, ids):
+        Recipe.objects.filter(pk__in=ids).update(
+            favorites_count=F('favorites_count') - 1
+        )
+
+
+class BulkShoppingCartRecipesViewSet(BulkRelationViewSet):
+    """Массовое добавление рецептов в корзину."""
+    relation_model = ShoppingCart
+    target_model = Recipe
+    target_field = 'recipe'
+
+    def after_create(self, request, ids):
+        Recipe.objects.filter(pk__in=ids).update(
+            in_carts_count=F('in_carts_count') + 1
+        )
+        add_to_shopping_lists([request.user.id], ids)
+        self.reset_shopping_list(request)
+
+    def after_destroy(self, request, ids):
+        Recipe.objects.filter(pk__in=ids).update(
+            in_carts_count=F('in_carts_count') - 1
+        )
+        remove_from_shopping_lists([request.user.id], ids)
+        self.reset_shopping_list(request)
+
+    def reset_shopping_list(self, request):
+        """Сброс версии корзины после фиксации транзакции."""
+        transaction.on_commit(
+            lambda: bump_shopping_cart_version(request.user.id)
+        )
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -92,7 +93,8 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0))
     }
 }
 # DATABASES = {
@@ -102,6 +104,18 @@ DATABASES = {
 #     }
 # }
 
+# Кэш по умолчанию хранится в памяти процесса. Если запускается
+# несколько воркеров, нужен общий кэш, например
+# django.core.cache.backends.memcached.PyMemcacheCache.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -158,7 +172,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ]
 }
 
@@ -168,3 +182,27 @@ DJOSER = {
         'current_user': 'api.serializers.CustomUserSerializer'
     }
 }
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 10000
+
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_THUMBNAIL_SIZES = (160, 320, 640)
+RECIPE_THUMBNAIL_WORKERS = 2
+
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60
+RECIPE_RESPONSE_PERSONALIZATION = True
+
+BULK_MAX_IDS = 100
+
+API_FAST_REPRESENTATIONS = True
+
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_SLOW_MS = 500
+REQUEST_METRICS_TOKEN = os.getenv('REQUEST_METRICS_TOKEN')
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60
@@ -1,15 +1,47 @@
 from django.contrib import admin
+from django.db import transaction
+
+from api.cache import bump_shopping_cart_version
 
 from .models import AmountIngredients, Ingredient, Recipe, Tag
+from .shopping_list import change_recipe_in_shopping_lists
+
+
+class AmountIngredientsInline(admin.TabularInline):
+    model = AmountIngredients
+    min_num = 1
+    extra = 0
 
 
 class RecipeAdmin(admin.ModelAdmin):
+    inlines = (AmountIngredientsInline,)
     readonly_fields = ('add_to_favorite',)
-    list_display = ('name', 'author',)
+    exclude = ('favorites_count', 'in_carts_count')
+    list_display = ('name', 'author', 'favorites_count')
     search_fields = ('author', 'name', 'tags')
 
     def add_to_favorite(self, instance):
-        return instance.favorite_recipes.count()
+        return instance.favorites_count
+
+    def get_amounts(self, recipe):
+        return dict(
+            recipe.amount_ingredients.values_list('ingredient_id', 'amount')
+        )
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = self.get_amounts(recipe) if change else {}
+        super().save_related(request, form, formsets, change)
+        if change:
+            change_recipe_in_shopping_lists(
+                recipe.pk, old_amounts, self.get_amounts(recipe)
+            )
+            user_ids = list(
+                recipe.shopping_cart.values_list('user_id', flat=True)
+            )
+            transaction.on_commit(
+                lambda: bump_shopping_cart_version(*user_ids)
+            )
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -20,4 +52,3 @@ class IngredientAdmin(admin.ModelAdmin):
 admin.site.register(Tag)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(AmountIngredients)
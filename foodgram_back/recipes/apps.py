@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from . import catalog, popularity, shopping_list  # noqa: F401
@@ -0,0 +1,108 @@
+from bisect import bisect_left
+from threading import Lock
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Ingredient
+
+INGREDIENT_CATALOG_VERSION_KEY = 'ingredient_catalog_version'
+
+
+class IngredientCatalog:
+    """
+    Справочник ингредиентов в памяти процесса.
+    Хранит строки (id, name, measurement_unit) в кортежах и
+    перечитывает таблицу, когда меняется версия справочника
+    в кэше Django.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.rows = ()
+        self.positions = {}
+        self.prefix_index = ()
+        self.lock = Lock()
+
+    def load(self):
+        version = cache.get_or_set(
+            INGREDIENT_CATALOG_VERSION_KEY, lambda: uuid4().hex, None
+        )
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            rows = tuple(
+                Ingredient.objects.order_by('pk').values_list(
+                    'pk', 'name', 'measurement_unit'
+                )
+            )
+            self.rows = rows
+            self.positions = {
+                row[0]: position for position, row in enumerate(rows)
+            }
+            self.prefix_index = tuple(sorted(
+                (row[1].lower(), row[0]) for row in rows
+            ))
+            self.version = version
+
+    def all(self):
+        self.load()
+        return self.rows
+
+    def get(self, pk):
+        self.load()
+        position = self.positions.get(pk)
+        if position is None:
+            return None
+        return self.rows[position]
+
+    def get_many(self, ids):
+        self.load()
+        return tuple(
+            self.rows[self.positions[pk]]
+            for pk in ids if pk in self.positions
+        )
+
+    def missing(self, ids):
+        """Идентификаторы, которых нет в справочнике."""
+        self.load()
+        return [pk for pk in ids if pk not in self.positions]
+
+    def search(self, name, limit):
+        """Сначала совпадения по началу названия, затем по вхождению."""
+        self.load()
+        name = name.lower()
+        entries = self.prefix_index
+        found = []
+        position = bisect_left(entries, (name,))
+        while (
+            position < len(entries)
+            and len(found) < limit
+            and entries[position][0].startswith(name)
+        ):
+            found.append(entries[position][1])
+            position += 1
+        for entry_name, pk in entries:
+            if len(found) >= limit:
+                break
+            if name in entry_name and not entry_name.startswith(name):
+                found.append(pk)
+        return found
+
+
+ingredient_catalog = IngredientCatalog()
+
+
+def bump_ingredient_catalog_version():
+    """Сброс версии: все процессы перечитают справочник."""
+    cache.delete(INGREDIENT_CATALOG_VERSION_KEY)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def reset_ingredient_catalog(**kwargs):
+    transaction.on_commit(bump_ingredient_catalog_version)
@@ -0,0 +1,73 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+THUMBNAILS_DIR = 'recipes/thumbnails/'
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails'
+)
+pending = set()
+pending_lock = Lock()
+
+
+def thumbnail_name(name, size):
+    """Путь миниатюры размера size для изображения name."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'{THUMBNAILS_DIR}{stem}_{size}.webp'
+
+
+def make_thumbnails(name):
+    """Создание недостающих WebP миниатюр изображения."""
+    sizes = [
+        size for size in settings.RECIPE_THUMBNAIL_SIZES
+        if not default_storage.exists(thumbnail_name(name, size))
+    ]
+    if not sizes:
+        return
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    for size in sizes:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size))
+        buffer = BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=80)
+        default_storage.save(
+            thumbnail_name(name, size), ContentFile(buffer.getvalue())
+        )
+
+
+def run_make_thumbnails(name):
+    try:
+        make_thumbnails(name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        with pending_lock:
+            pending.discard(name)
+
+
+def schedule_thumbnails(name):
+    """
+    Создание миниатюр в фоновом потоке.
+    Одно изображение не обрабатывается двумя задачами одновременно.
+    """
+    if not name:
+        return
+    with pending_lock:
+        if name in pending:
+            return
+        pending.add(name)
+    executor.submit(run_make_thumbnails, name)
@@ -1,22 +1,206 @@
 import csv
+import io
+import json
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from recipes.catalog import bump_ingredient_catalog_version
 from recipes.models import Ingredient
 
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row
+
+
+def read_json(file):
+    """
+    Построчное чтение JSON массива объектов без загрузки
+    всего файла в память.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started and buffer:
+            if not buffer.startswith('['):
+                raise CommandError('Ожидается JSON массив объектов.')
+            buffer = buffer[1:]
+            started = True
+            continue
+        buffer = buffer.lstrip(', \t\r\n')
+        if buffer.startswith(']'):
+            return
+        if buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                if eof:
+                    raise CommandError('Некорректный JSON файл.')
+            else:
+                buffer = buffer[end:]
+                yield item
+                continue
+        if eof:
+            return
+        chunk = file.read(JSON_CHUNK_SIZE)
+        eof = not chunk
+        buffer += chunk
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
 
 class Command(BaseCommand):
-    help = 'Загрузка из csv файла'
-
-    def handle(self, *args, **kwargs):
-        data_path = settings.BASE_DIR
-        with open(
-            f'{data_path}/data/ingredients.csv',
-            'r',
-            encoding='utf-8'
-        ) as file:
-            reader = csv.DictReader(file)
-            Ingredient.objects.bulk_create(
-                Ingredient(**data) for data in reader)
-        self.stdout.write(self.style.SUCCESS('Все ингридиенты загружены!'))
+    help = (
+        'Загрузка ингредиентов из csv или json файла. '
+        'Уже существующие ингредиенты пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=f'{settings.BASE_DIR}/data/ingredients.csv',
+            help='Путь к файлу с ингредиентами.'
+        )
+        parser.add_argument(
+            '--format',
+            choices=tuple(READERS),
+            help='Формат файла, по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной вставке.'
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загрузка через COPY (только PostgreSQL).'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Проверить файл и посчитать новые строки без записи.'
+        )
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1]
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {file_format}.')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy поддерживается только PostgreSQL.')
+        self.name_length = Ingredient._meta.get_field('name').max_length
+        self.unit_length = Ingredient._meta.get_field(
+            'measurement_unit'
+        ).max_length
+        self.read = 0
+        self.invalid = 0
+        started = time.monotonic()
+        before = Ingredient.objects.count()
+        with open(options['path'], 'r', encoding='utf-8') as file:
+            rows = self.clean_rows(READERS[file_format](file))
+            row_batches = batches(rows, options['batch_size'])
+            if options['dry_run']:
+                inserted = self.dry_run(row_batches)
+            else:
+                with transaction.atomic():
+                    if options['copy']:
+                        self.copy(row_batches)
+                    else:
+                        for batch in row_batches:
+                            Ingredient.objects.bulk_create(
+                                (
+                                    Ingredient(
+                                        name=name, measurement_unit=unit
+                                    )
+                                    for name, unit in batch
+                                ),
+                                ignore_conflicts=True
+                            )
+                inserted = Ingredient.objects.count() - before
+                bump_ingredient_catalog_version()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет загружено" if options["dry_run"] else "Загружено"} '
+            f'{inserted} новых ингридиентов из {self.read} строк, '
+            f'пропущено некорректных: {self.invalid}. '
+            f'{elapsed:.2f} с, {self.read / (elapsed or 1):.0f} строк/с.'
+        ))
+
+    def clean_rows(self, rows):
+        for row in rows:
+            self.read += 1
+            if not isinstance(row, dict):
+                self.invalid += 1
+                continue
+            name = str(row.get('name') or '').strip()
+            unit = str(row.get('measurement_unit') or '').strip()
+            if (
+                not name or not unit
+                or len(name) > self.name_length
+                or len(unit) > self.unit_length
+            ):
+                self.invalid += 1
+                continue
+            yield name, unit
+
+    def dry_run(self, row_batches):
+        seen = set()
+        new = 0
+        for batch in row_batches:
+            existing = set(
+                Ingredient.objects.filter(
+                    name__in={name for name, _ in batch}
+                ).values_list('name', 'measurement_unit')
+            )
+            for key in batch:
+                if key not in existing and key not in seen:
+                    seen.add(key)
+                    new += 1
+        return new
+
+    def copy(self, row_batches):
+        """
+        Строки копируются во временную таблицу через COPY,
+        затем вставляются одним INSERT ... ON CONFLICT DO NOTHING.
+        """
+        table = Ingredient._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_import '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in row_batches:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_import FROM STDIN WITH CSV', buffer
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_import '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from recipes.images import make_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание миниатюр для изображений рецептов.'
+
+    def handle(self, *args, **kwargs):
+        images = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', flat=True).distinct()
+        for name in images.iterator():
+            make_thumbnails(name)
+        self.stdout.write(self.style.SUCCESS('Миниатюры созданы.'))
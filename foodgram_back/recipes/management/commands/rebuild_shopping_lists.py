@@ -0,0 +1,43 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.shopping_list import (find_inconsistent_users,
+                                   rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка и пересборка списков покупок пользователей '
+        'по их корзинам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, nargs='+',
+            help='Идентификаторы пользователей, по умолчанию все.'
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить списки, завершиться с ошибкой '
+                 'при расхождении.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+        if options['check']:
+            inconsistent = find_inconsistent_users(user_ids)
+            if inconsistent:
+                raise CommandError(
+                    'Списки покупок расходятся с корзиной у пользователей: '
+                    + ', '.join(map(str, sorted(inconsistent)))
+                )
+            self.stdout.write(
+                self.style.SUCCESS('Списки покупок совпадают с корзинами.')
+            )
+            return
+        with transaction.atomic():
+            count = rebuild_shopping_lists(user_ids, options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано строк списков покупок: {count}.')
+        )
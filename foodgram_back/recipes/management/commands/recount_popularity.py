@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipes, Recipe, ShoppingCart
+
+
+def count_for(model):
+    """Подзапрос количества строк model, ссылающихся на рецепт."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+                'recipe'
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Пересчет счетчиков избранного и корзины у рецептов.'
+
+    def handle(self, *args, **kwargs):
+        updated = Recipe.objects.update(
+            favorites_count=count_for(FavoriteRecipes),
+            in_carts_count=count_for(ShoppingCart)
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Счетчики пересчитаны у {updated} рецептов.')
+        )
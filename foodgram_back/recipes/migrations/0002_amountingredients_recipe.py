@@ -0,0 +1,99 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def check_constraints_now(schema_editor):
+    """
+    В PostgreSQL отложенные проверки внешних ключей после изменения
+    данных не дают выполнить ALTER TABLE в той же транзакции.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+def link_amounts_to_recipes(apps, schema_editor):
+    """
+    Раньше строки AmountIngredients были общими для нескольких рецептов.
+    Для каждой пары рецепт-ингредиент создается собственная строка,
+    повторяющиеся ингредиенты одного рецепта суммируются.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    AmountIngredients = apps.get_model('recipes', 'AmountIngredients')
+    links = Recipe.ingredients.through.objects.values_list(
+        'recipe_id',
+        'amountingredients__ingredient_id',
+        'amountingredients__amount'
+    )
+    amounts = {}
+    for recipe_id, ingredient_id, amount in links.iterator():
+        key = (recipe_id, ingredient_id)
+        amounts[key] = amounts.get(key, 0) + amount
+    AmountIngredients.objects.all().delete()
+    AmountIngredients.objects.bulk_create(
+        (
+            AmountIngredients(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=amount
+            )
+            for (recipe_id, ingredient_id), amount in amounts.items()
+        ),
+        batch_size=1000
+    )
+    check_constraints_now(schema_editor)
+
+
+def unlink_amounts_from_recipes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    AmountIngredients = apps.get_model('recipes', 'AmountIngredients')
+    Recipe.ingredients.through.objects.bulk_create(
+        (
+            Recipe.ingredients.through(
+                recipe_id=recipe_id,
+                amountingredients_id=amount_id
+            )
+            for amount_id, recipe_id in AmountIngredients.objects.values_list(
+                'id', 'recipe_id'
+            ).iterator()
+        ),
+        batch_size=1000
+    )
+    check_constraints_now(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amountingredients',
+            name='recipe',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='amount_ingredients', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.RunPython(
+            link_amounts_to_recipes, unlink_amounts_from_recipes
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='ingredients',
+        ),
+        migrations.AlterField(
+            model_name='amountingredients',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='amount_ingredients', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(through='recipes.AmountIngredients', to='recipes.Ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='amountingredients',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
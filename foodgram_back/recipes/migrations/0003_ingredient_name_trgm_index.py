@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:02
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Триграммный индекс для поиска ингредиентов по вхождению названия.
+    Django ищет без учета регистра через UPPER(name) LIKE, поэтому
+    индекс строится по тому же выражению. Создается только на PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm '
+        'ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipes_ingredient_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_amountingredients_recipe'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
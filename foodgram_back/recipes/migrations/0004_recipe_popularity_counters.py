@@ -0,0 +1,53 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:39
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_popularity(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipes = apps.get_model('recipes', 'FavoriteRecipes')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+
+    def count_for(model):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(recipe=OuterRef('pk')).order_by(
+                ).values('recipe').annotate(total=Count('pk')).values(
+                    'total'
+                ),
+                output_field=IntegerField()
+            ),
+            0
+        )
+
+    Recipe.objects.update(
+        favorites_count=count_for(FavoriteRecipes),
+        in_carts_count=count_for(ShoppingCart)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_ingredient_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Добавлений в корзину'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipe_popular_idx'),
+        ),
+        migrations.RunPython(count_popularity, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Повторный запуск load_ingrs мог создать одинаковые ингредиенты.
+    Рецепты переносятся на ингредиент с наименьшим id, количества
+    одного ингредиента в рецепте суммируются, дубли удаляются.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    AmountIngredients = apps.get_model('recipes', 'AmountIngredients')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates.iterator():
+        ingredient_ids = list(
+            Ingredient.objects.filter(
+                name=duplicate['name'],
+                measurement_unit=duplicate['measurement_unit']
+            ).exclude(id=duplicate['keep_id']).values_list('id', flat=True)
+        )
+        amounts = AmountIngredients.objects.filter(
+            ingredient_id__in=ingredient_ids
+        )
+        for amount in amounts:
+            kept, created = AmountIngredients.objects.get_or_create(
+                recipe_id=amount.recipe_id,
+                ingredient_id=duplicate['keep_id'],
+                defaults={'amount': amount.amount}
+            )
+            if not created:
+                kept.amount += amount.amount
+                kept.save()
+        amounts.delete()
+        Ingredient.objects.filter(id__in=ingredient_ids).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # Отложенные проверки внешних ключей мешают ALTER TABLE ниже.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_recipe_popularity_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0005_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriterecipes',
+            index=models.Index(fields=['user', 'recipe'], name='favorite_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['user', 'recipe'], name='cart_user_recipe_idx'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON recipes_recipe_tags (tag_id, recipe_id)',
+            'DROP INDEX recipe_tags_tag_recipe_idx'
+        ),
+        migrations.AlterField(
+            model_name='favoriterecipes',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='favorite_recipes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
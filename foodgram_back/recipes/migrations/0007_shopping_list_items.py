@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def build_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('recipes', 'ShoppingListItem')
+    rows = ShoppingCart.objects.values(
+        'user_id',
+        ingredient_id=F('recipe__amount_ingredients__ingredient')
+    ).annotate(
+        total=Sum('recipe__amount_ingredients__amount')
+    ).order_by()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=row['user_id'],
+                ingredient_id=row['ingredient_id'],
+                total_amount=row['total']
+            )
+            for row in rows.iterator()
+            if row['ingredient_id'] is not None and row['total']
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Списки покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(build_shopping_lists, migrations.RunPython.noop),
+    ]
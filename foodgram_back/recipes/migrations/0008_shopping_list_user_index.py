@@ -0,0 +1,21 @@
+# Generated by Django 3.2.16 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_shopping_list_items'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shoppinglistitem',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+    ]
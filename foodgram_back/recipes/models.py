@@ -25,14 +25,16 @@ class Recipe(models.Model):
     Модель рецепта.
     """
     ingredients = models.ManyToManyField(
-        'AmountIngredients'
+        'Ingredient',
+        through='AmountIngredients'
     )
     name = models.CharField("Название", max_length=200)
     author = models.ForeignKey(
         CustomUser,
         verbose_name='Автор',
         related_name='recipes',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     text = models.TextField("Описание", max_length=250)
     tags = models.ManyToManyField(Tag)
@@ -43,11 +45,29 @@ class Recipe(models.Model):
         default=None
     )
     cooking_time = models.IntegerField("Время приготовления.")
+    favorites_count = models.PositiveIntegerField(
+        "Добавлений в избранное",
+        default=0
+    )
+    in_carts_count = models.PositiveIntegerField(
+        "Добавлений в корзину",
+        default=0
+    )
 
     class Meta:
         ordering = ('-pk',)
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        indexes = [
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -63,6 +83,12 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_name_unit'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -70,6 +96,12 @@ class Ingredient(models.Model):
 
 class AmountIngredients(models.Model):
     """Связывающая модель рецептов и ингридиентов."""
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='amount_ingredients',
+        on_delete=models.CASCADE
+    )
     ingredient = models.ForeignKey(
         Ingredient,
         verbose_name="Название ингредиента",
@@ -86,6 +118,12 @@ class AmountIngredients(models.Model):
     class Meta:
         verbose_name = "Количество ингредиентов"
         verbose_name_plural = "Количества ингериентов в рецептах"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            )
+        ]
 
 
 class FavoriteRecipes(models.Model):
@@ -100,7 +138,8 @@ class FavoriteRecipes(models.Model):
         CustomUser,
         on_delete=models.CASCADE,
         related_name='favorite_recipes',
-        verbose_name='Пользователь'
+        verbose_name='Пользователь',
+        db_index=False
     )
 
     class Meta:
@@ -112,6 +151,12 @@ class FavoriteRecipes(models.Model):
                 name='unique_user_favorite_recipe'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'],
+                name='favorite_user_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return self.recipe
@@ -127,7 +172,8 @@ class ShoppingCart(models.Model):
     user = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
-        related_name='shopping_cart'
+        related_name='shopping_cart',
+        db_index=False
     )
 
     class Meta:
@@ -139,6 +185,46 @@ class ShoppingCart(models.Model):
                 name='unique_user_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'recipe'],
+                name='cart_user_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.recipe.name}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Итог по ингредиенту в списке покупок пользователя.
+    Пересчитывается при изменении корзины и ингредиентов рецептов.
+    """
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+        db_index=False
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient} {self.total_amount}'
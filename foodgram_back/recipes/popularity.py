@@ -0,0 +1,21 @@
+from django.db.models import F
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from users.models import CustomUser
+
+from .models import Recipe
+
+
+@receiver(pre_delete, sender=CustomUser)
+def remove_deleted_user_counters(instance, **kwargs):
+    """
+    Избранное и корзина удаляемого пользователя удаляются каскадом,
+    поэтому счетчики рецептов уменьшаются заранее.
+    """
+    Recipe.objects.filter(favorite_recipes__user=instance).update(
+        favorites_count=F('favorites_count') - 1
+    )
+    Recipe.objects.filter(shopping_cart__user=instance).update(
+        in_carts_count=F('in_carts_count') - 1
+    )
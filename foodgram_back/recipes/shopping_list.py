@@ -0,0 +1,188 @@
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .catalog import ingredient_catalog
+from .models import (AmountIngredients, Ingredient, Recipe, ShoppingCart,
+                     ShoppingListItem)
+
+
+def recipe_amounts(recipe_ids):
+    """Суммарное количество каждого ингредиента в рецептах."""
+    return dict(
+        AmountIngredients.objects.filter(recipe_id__in=recipe_ids).values(
+            'ingredient_id'
+        ).annotate(total=Sum('amount')).values_list('ingredient_id', 'total')
+    )
+
+
+def update_shopping_lists(user_ids, deltas):
+    """
+    Изменение списков покупок пользователей на deltas
+    по ингредиентам одним UPDATE. Строки для новых ингредиентов
+    создаются заранее, обнулившиеся строки удаляются.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items() if delta > 0
+        ),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    items.update(
+        total_amount=Greatest(
+            F('total_amount') + Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(delta))
+                    for ingredient_id, delta in deltas.items()
+                ),
+                default=Value(0),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        )
+    )
+    items.filter(total_amount=0).delete()
+
+
+def add_to_shopping_lists(user_ids, recipe_ids):
+    """Добавление ингредиентов рецептов в списки покупок."""
+    update_shopping_lists(user_ids, recipe_amounts(recipe_ids))
+
+
+def remove_from_shopping_lists(user_ids, recipe_ids):
+    """Вычитание ингредиентов рецептов из списков покупок."""
+    update_shopping_lists(user_ids, {
+        ingredient_id: -total
+        for ingredient_id, total in recipe_amounts(recipe_ids).items()
+    })
+
+
+def change_recipe_in_shopping_lists(recipe_id, old_amounts, new_amounts):
+    """
+    Перенос изменения ингредиентов рецепта в списки покупок
+    всех пользователей, у которых рецепт в корзине.
+    """
+    update_shopping_lists(
+        ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+            'user_id', flat=True
+        ),
+        {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in {*old_amounts, *new_amounts}
+        }
+    )
+
+
+def shopping_list_positions(user_id):
+    """
+    Строки списка покупок пользователя. Названия и единицы измерения
+    берутся из справочника ингредиентов, поэтому запрос читает только
+    индекс списка покупок без соединения с таблицей ингредиентов.
+    """
+    amounts = dict(
+        ShoppingListItem.objects.filter(user_id=user_id).values_list(
+            'ingredient_id', 'total_amount'
+        )
+    )
+    rows = list(ingredient_catalog.get_many(amounts))
+    missing = ingredient_catalog.missing(amounts)
+    if missing:
+        rows.extend(
+            Ingredient.objects.filter(pk__in=missing).values_list(
+                'pk', 'name', 'measurement_unit'
+            )
+        )
+    for pk, name, measurement_unit in rows:
+        yield {
+            'name': name,
+            'measurement_unit': measurement_unit,
+            'total_amount': amounts[pk],
+        }
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_deleted_recipe(instance, **kwargs):
+    """
+    Удаляемый рецепт вычитается из списков покупок. Срабатывает и
+    при каскадном удалении, например вместе с автором.
+    """
+    remove_from_shopping_lists(
+        instance.shopping_cart.values_list('user_id', flat=True),
+        [instance.pk]
+    )
+
+
+def expected_shopping_lists(user_ids=None):
+    """Списки покупок, посчитанные заново по корзинам."""
+    carts = ShoppingCart.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+    rows = carts.values(
+        'user_id',
+        ingredient_id=F('recipe__amount_ingredients__ingredient')
+    ).annotate(
+        total=Sum('recipe__amount_ingredients__amount')
+    ).order_by()
+    return {
+        (row['user_id'], row['ingredient_id']): row['total']
+        for row in rows.iterator() if row['ingredient_id'] is not None
+    }
+
+
+def stored_shopping_lists(user_ids=None):
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in items.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator()
+    }
+
+
+def find_inconsistent_users(user_ids=None):
+    """Пользователи, чьи списки покупок расходятся с корзиной."""
+    expected = expected_shopping_lists(user_ids)
+    stored = stored_shopping_lists(user_ids)
+    return {
+        user_id for user_id, ingredient_id in {*expected, *stored}
+        if expected.get((user_id, ingredient_id))
+        != stored.get((user_id, ingredient_id))
+    }
+
+
+def rebuild_shopping_lists(user_ids=None, batch_size=1000):
+    """Пересборка списков покупок по корзинам."""
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+    items.delete()
+    expected = expected_shopping_lists(user_ids)
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total
+            )
+            for (user_id, ingredient_id), total in expected.items()
+            if total
+        ),
+        batch_size=batch_size
+    )
+    return len(expected)
@@ -0,0 +1,83 @@
+import re
+from decimal import Decimal
+
+# Единица измерения -> (базовая единица, множитель).
+CONVERSIONS = {
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'килограмм': ('г', 1000),
+    'мл': ('мл', 1),
+    'миллилитр': ('мл', 1),
+    'л': ('мл', 1000),
+    'литр': ('мл', 1000),
+    'ч. л.': ('ч. л.', 1),
+    'чайная ложка': ('ч. л.', 1),
+    'ст. л.': ('ч. л.', 3),
+    'столовая ложка': ('ч. л.', 3),
+    'шт.': ('шт.', 1),
+    'шт': ('шт.', 1),
+    'штука': ('шт.', 1),
+}
+
+# Базовая единица -> (крупная единица, множитель, только целое число).
+DISPLAY_UNITS = {
+    'г': ('кг', 1000, False),
+    'мл': ('л', 1000, False),
+    'ч. л.': ('ст. л.', 3, True),
+}
+
+
+def normalize_unit(unit):
+    """Единица в нижнем регистре с одиночными пробелами."""
+    unit = re.sub(r'\s+', ' ', unit.strip().lower())
+    return re.sub(r'\.(?=\S)', '. ', unit)
+
+
+def to_base(unit, amount):
+    """Количество в базовой единице."""
+    unit = normalize_unit(unit)
+    base, factor = CONVERSIONS.get(unit, (unit, 1))
+    return base, amount * factor
+
+
+def to_display(base, amount):
+    """Количество в крупной единице, если оно ее не меньше."""
+    if base in DISPLAY_UNITS:
+        unit, factor, whole = DISPLAY_UNITS[base]
+        if amount >= factor and not (whole and amount % factor):
+            amount = Decimal(amount) / factor
+            amount = int(amount) if amount == int(amount) else float(
+                round(amount, 3)
+            )
+            return unit, amount
+    return base, amount
+
+
+def merge_units(positions):
+    """
+    Объединение строк списка покупок с одним названием и
+    совместимыми единицами измерения за один проход.
+    Строки возвращаются отсортированными по названию.
+    """
+    merged = {}
+    for position in positions:
+        base, amount = to_base(
+            position['measurement_unit'], position['total_amount']
+        )
+        key = (position['name'].strip().lower(), base)
+        if key in merged:
+            merged[key][0] = min(merged[key][0], position['name'])
+            merged[key][1] += amount
+        else:
+            merged[key] = [position['name'], amount]
+    result = []
+    for (_, base), (name, amount) in sorted(merged.items()):
+        unit, amount = to_display(base, amount)
+        result.append({
+            'name': name,
+            'measurement_unit': unit,
+            'total_amount': amount,
+        })
+    return result
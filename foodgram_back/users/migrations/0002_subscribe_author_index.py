@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscribe',
+            index=models.Index(fields=['author', 'user'], name='subscribe_author_user_idx'),
+        ),
+        migrations.AlterField(
+            model_name='subscribe',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscribing', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+    ]
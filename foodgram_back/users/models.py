@@ -32,7 +32,8 @@ class Subscribe(models.Model):
         CustomUser,
         on_delete=models.CASCADE,
         related_name='subscribing',
-        verbose_name='Автор'
+        verbose_name='Автор',
+        db_index=False
     )
 
     class Meta:
@@ -44,6 +45,12 @@ class Subscribe(models.Model):
                 name='unique_user_subscribing'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='subscribe_author_user_idx'
+            )
+        ]
 
     def __str__(self):
         return self.author.username